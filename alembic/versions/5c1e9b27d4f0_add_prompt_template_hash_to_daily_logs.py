@@ -0,0 +1,30 @@
+"""Add prompt template hash and variables to daily_logs
+
+Revision ID: 5c1e9b27d4f0
+Revises: a0481ad3d4a3
+Create Date: 2026-10-18 09:12:04.118302
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1e9b27d4f0'
+down_revision: Union[str, Sequence[str], None] = 'a0481ad3d4a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('daily_logs', sa.Column('prompt_template_hash', sa.String(length=16), nullable=True))
+    op.add_column('daily_logs', sa.Column('prompt_variables', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('daily_logs', 'prompt_variables')
+    op.drop_column('daily_logs', 'prompt_template_hash')
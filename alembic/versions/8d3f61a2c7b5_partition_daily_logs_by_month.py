@@ -0,0 +1,132 @@
+"""Partition daily_logs by month and add daily_logs_archive
+
+Revision ID: 8d3f61a2c7b5
+Revises: 5c1e9b27d4f0
+Create Date: 2026-10-18 10:41:37.502196
+
+"""
+import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d3f61a2c7b5'
+down_revision: Union[str, Sequence[str], None] = '5c1e9b27d4f0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+LOG_COLUMNS = (
+    "id, user_id, date, message_type, message_content, ai_prompt_used, "
+    "prompt_template_hash, prompt_variables, sent_at, is_sent"
+)
+PARTITIONS_AHEAD = 2
+
+
+def _add_months(day: datetime.date, months: int) -> datetime.date:
+    month_index = day.year * 12 + (day.month - 1) + months
+    return datetime.date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    conn = op.get_bind()
+
+    op.execute("ALTER TABLE daily_logs RENAME TO daily_logs_legacy")
+    op.execute("ALTER TABLE daily_logs_legacy RENAME CONSTRAINT daily_logs_pkey TO daily_logs_legacy_pkey")
+    op.execute("ALTER TABLE daily_logs_legacy RENAME CONSTRAINT daily_logs_user_id_fkey TO daily_logs_legacy_user_id_fkey")
+    op.execute("ALTER INDEX ix_daily_logs_date RENAME TO ix_daily_logs_legacy_date")
+    op.execute("ALTER INDEX ix_daily_logs_id RENAME TO ix_daily_logs_legacy_id")
+
+    op.execute("""
+        CREATE TABLE daily_logs (
+            id INTEGER NOT NULL DEFAULT nextval('daily_logs_id_seq'),
+            user_id UUID REFERENCES users (id),
+            date DATE NOT NULL,
+            message_type VARCHAR,
+            message_content VARCHAR,
+            ai_prompt_used VARCHAR,
+            prompt_template_hash VARCHAR(16),
+            prompt_variables JSON,
+            sent_at TIMESTAMP WITHOUT TIME ZONE,
+            is_sent BOOLEAN,
+            PRIMARY KEY (id, date)
+        ) PARTITION BY RANGE (date)
+    """)
+    op.create_index(op.f('ix_daily_logs_date'), 'daily_logs', ['date'], unique=False)
+    op.create_index(op.f('ix_daily_logs_id'), 'daily_logs', ['id'], unique=False)
+    op.create_index('ix_daily_logs_user_id_date', 'daily_logs', ['user_id', 'date'], unique=False)
+
+    # one partition per month that has data, up to a couple of months ahead,
+    # plus a default partition so a missed maintenance run never breaks inserts
+    today = datetime.date.today().replace(day=1)
+    oldest = conn.execute(sa.text("SELECT min(COALESCE(date, sent_at::date)) FROM daily_logs_legacy")).scalar()
+    month = min(oldest.replace(day=1), today) if oldest else today
+    last = _add_months(today, PARTITIONS_AHEAD)
+    while month <= last:
+        end = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE daily_logs_{month:%Y_%m} PARTITION OF daily_logs "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{end.isoformat()}')"
+        )
+        month = end
+    op.execute("CREATE TABLE daily_logs_default PARTITION OF daily_logs DEFAULT")
+
+    op.execute(f"""
+        INSERT INTO daily_logs ({LOG_COLUMNS})
+        SELECT id, user_id, COALESCE(date, sent_at::date, CURRENT_DATE), message_type, message_content,
+               ai_prompt_used, prompt_template_hash, prompt_variables, sent_at, is_sent
+        FROM daily_logs_legacy
+    """)
+    op.execute("ALTER SEQUENCE daily_logs_id_seq OWNED BY daily_logs.id")
+    op.drop_table('daily_logs_legacy')
+
+    op.create_table('daily_logs_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=True),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('message_type', sa.String(), nullable=True),
+    sa.Column('message_content', sa.String(), nullable=True),
+    sa.Column('ai_prompt_used', sa.String(), nullable=True),
+    sa.Column('prompt_template_hash', sa.String(length=16), nullable=True),
+    sa.Column('prompt_variables', sa.JSON(), nullable=True),
+    sa.Column('sent_at', sa.DateTime(), nullable=True),
+    sa.Column('is_sent', sa.Boolean(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id', 'date')
+    )
+    op.create_index('ix_daily_logs_archive_user_id_date', 'daily_logs_archive', ['user_id', 'date'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER TABLE daily_logs RENAME TO daily_logs_partitioned")
+    op.execute("ALTER INDEX ix_daily_logs_date RENAME TO ix_daily_logs_partitioned_date")
+    op.execute("ALTER INDEX ix_daily_logs_id RENAME TO ix_daily_logs_partitioned_id")
+
+    op.create_table('daily_logs',
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('daily_logs_id_seq')"), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=True),
+    sa.Column('date', sa.Date(), nullable=True),
+    sa.Column('message_type', sa.String(), nullable=True),
+    sa.Column('message_content', sa.String(), nullable=True),
+    sa.Column('ai_prompt_used', sa.String(), nullable=True),
+    sa.Column('prompt_template_hash', sa.String(length=16), nullable=True),
+    sa.Column('prompt_variables', sa.JSON(), nullable=True),
+    sa.Column('sent_at', sa.DateTime(), nullable=True),
+    sa.Column('is_sent', sa.Boolean(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute(f"INSERT INTO daily_logs ({LOG_COLUMNS}) SELECT {LOG_COLUMNS} FROM daily_logs_archive")
+    op.execute(f"INSERT INTO daily_logs ({LOG_COLUMNS}) SELECT {LOG_COLUMNS} FROM daily_logs_partitioned")
+    op.execute("ALTER SEQUENCE daily_logs_id_seq OWNED BY daily_logs.id")
+
+    op.drop_index('ix_daily_logs_archive_user_id_date', table_name='daily_logs_archive')
+    op.drop_table('daily_logs_archive')
+    op.execute("DROP TABLE daily_logs_partitioned CASCADE")
+
+    op.create_index(op.f('ix_daily_logs_date'), 'daily_logs', ['date'], unique=False)
+    op.create_index(op.f('ix_daily_logs_id'), 'daily_logs', ['id'], unique=False)
@@ -0,0 +1,53 @@
+"""Add user_daily_stats aggregate table
+
+Revision ID: b2e7c04f9a13
+Revises: 8d3f61a2c7b5
+Create Date: 2026-10-18 12:05:51.730144
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b2e7c04f9a13'
+down_revision: Union[str, Sequence[str], None] = '8d3f61a2c7b5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('user_daily_stats',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('messages_generated', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('messages_sent', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('messages_failed', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'date')
+    )
+
+    # one-off backfill from the existing hot + archived logs
+    op.execute("""
+        INSERT INTO user_daily_stats (user_id, date, messages_generated, messages_sent, messages_failed)
+        SELECT user_id, date,
+               count(*),
+               count(*) FILTER (WHERE is_sent),
+               count(*) FILTER (WHERE is_sent IS NOT TRUE)
+        FROM (
+            SELECT user_id, date, is_sent FROM daily_logs
+            UNION ALL
+            SELECT user_id, date, is_sent FROM daily_logs_archive
+        ) AS logs
+        WHERE user_id IS NOT NULL
+        GROUP BY user_id, date
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('user_daily_stats')
@@ -0,0 +1,34 @@
+"""Add per-user digest delivery policy and daily_logs.delivery_id
+
+Revision ID: e41a7d93b0c6
+Revises: b2e7c04f9a13
+Create Date: 2026-10-18 13:27:10.846521
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e41a7d93b0c6'
+down_revision: Union[str, Sequence[str], None] = 'b2e7c04f9a13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('delivery_policy', sa.String(length=10), server_default='immediate', nullable=False))
+    op.add_column('users', sa.Column('digest_window_minutes', sa.Integer(), server_default='60', nullable=False))
+    op.add_column('daily_logs', sa.Column('delivery_id', sa.String(length=32), nullable=True))
+    op.add_column('daily_logs_archive', sa.Column('delivery_id', sa.String(length=32), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('daily_logs_archive', 'delivery_id')
+    op.drop_column('daily_logs', 'delivery_id')
+    op.drop_column('users', 'digest_window_minutes')
+    op.drop_column('users', 'delivery_policy')
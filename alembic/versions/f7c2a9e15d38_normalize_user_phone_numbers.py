@@ -0,0 +1,53 @@
+"""Normalize users.phone_number to E.164
+
+Revision ID: f7c2a9e15d38
+Revises: e41a7d93b0c6
+Create Date: 2026-10-19 09:12:44.318207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f7c2a9e15d38'
+down_revision: Union[str, Sequence[str], None] = 'e41a7d93b0c6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # same rules as utils/phone_utils.normalize_phone_number with the default country code 1.
+    # phone_number is unique, so when two rows normalize to the same number only the oldest
+    # one is rewritten, and a number someone already has in E.164 is left alone
+    op.execute(r"""
+        WITH normalized AS (
+            SELECT id, created_at,
+                CASE
+                    WHEN phone_number LIKE '+%' THEN '+' || regexp_replace(phone_number, '\D', '', 'g')
+                    WHEN regexp_replace(phone_number, '\D', '', 'g') ~ '^[0-9]{10}$' THEN '+1' || regexp_replace(phone_number, '\D', '', 'g')
+                    WHEN regexp_replace(phone_number, '\D', '', 'g') ~ '^1[0-9]{10}$' THEN '+' || regexp_replace(phone_number, '\D', '', 'g')
+                END AS e164
+            FROM users
+            WHERE phone_number IS NOT NULL
+        ), first_per_number AS (
+            SELECT DISTINCT ON (e164) id, e164
+            FROM normalized
+            WHERE e164 IS NOT NULL
+            ORDER BY e164, created_at
+        )
+        UPDATE users SET phone_number = first_per_number.e164
+        FROM first_per_number
+        WHERE users.id = first_per_number.id
+          AND users.phone_number <> first_per_number.e164
+          AND NOT EXISTS (SELECT 1 FROM users other WHERE other.phone_number = first_per_number.e164)
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # formatting only, E.164 numbers still work with the old code for sending
+    pass
@@ -1,19 +1,35 @@
 import os
+import time
+import asyncio
+import logging
+from uuid import UUID
+from typing import Optional
+from fastapi import Request
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 from dotenv import load_dotenv
 
+logger = logging.getLogger(__name__)
+
 load_dotenv()
 
 
 DB_URL = os.getenv("DB_NEON_URL")
+# optional read replica, read endpoints use it through get_read_db
+DB_REPLICA_URL = os.getenv("DB_NEON_REPLICA_URL")
+# after a write, that user's reads stay on the primary for this long
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+REPLICA_HEALTH_INTERVAL = float(os.getenv("REPLICA_HEALTH_INTERVAL", "10"))
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", str(READ_YOUR_WRITES_SECONDS)))
 
 if not DB_URL:
     raise ValueError("DB URL not set. Check .env.")
 
-#to help with debugging db
+#to help with debugging db, echo writes every statement (set DB_ECHO=true locally, or LOG_LEVELS=sqlalchemy.engine=INFO)
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() == "true"
 
-engine = create_async_engine(DB_URL, echo=True)
+engine = create_async_engine(DB_URL, echo=DB_ECHO)
 
 #creating sessions for db interactions
 
@@ -25,6 +41,20 @@ AsyncSessionLocal = async_sessionmaker(
     expire_on_commit=False,
 )
 
+replica_engine = create_async_engine(DB_REPLICA_URL, echo=DB_ECHO) if DB_REPLICA_URL else None
+
+ReplicaSessionLocal = async_sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    bind=replica_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+) if replica_engine else None
+
+replica_state = {"healthy": replica_engine is not None, "lag_seconds": None, "last_error": None}
+
+_recent_writes: dict = {}
+
 Base = declarative_base()
 
 #fastapi dependency to inject sessions ito route fcns
@@ -40,6 +70,69 @@ async def get_db():
         finally:
             await session.close()
 
+def mark_user_write(user_id) -> None:
+    """call after committing a write so that user's next reads see it (read-your-writes)"""
+    now = time.monotonic()
+    if len(_recent_writes) > 10000:
+        for key in [key for key, until in _recent_writes.items() if until < now]:
+            del _recent_writes[key]
+    _recent_writes[str(user_id)] = now + READ_YOUR_WRITES_SECONDS
+
+
+def wrote_recently(user_id) -> bool:
+    until = _recent_writes.get(str(user_id))
+    return until is not None and until > time.monotonic()
+
+
+async def get_read_db(request: Request):
+    """
+    read-only session. goes to the replica when one is configured and healthy,
+    unless the user in the path wrote something in the last READ_YOUR_WRITES_SECONDS
+    """
+    user_id: Optional[str] = request.path_params.get("user_id")
+    if user_id:
+        # the raw path segment, normalize it to the str(UUID) form mark_user_write stores
+        try:
+            user_id = str(UUID(user_id))
+        except ValueError:
+            user_id = None # the route itself rejects it with a 422
+    use_replica = (
+        ReplicaSessionLocal is not None
+        and replica_state["healthy"]
+        and not (user_id and wrote_recently(user_id))
+    )
+    session_factory = ReplicaSessionLocal if use_replica else AsyncSessionLocal
+
+    async with session_factory() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+
+async def check_replica_health() -> bool:
+    try:
+        async with replica_engine.connect() as conn:
+            result = await asyncio.wait_for(conn.execute(text(
+                "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+                "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+            )), timeout=REPLICA_HEALTH_INTERVAL)
+            lag = float(result.scalar_one() or 0)
+        replica_state["lag_seconds"] = lag
+        replica_state["last_error"] = None
+        replica_state["healthy"] = lag <= REPLICA_MAX_LAG_SECONDS
+    except Exception as e:
+        replica_state["healthy"] = False
+        replica_state["last_error"] = str(e)
+        logger.warning("Read replica unhealthy, routing reads to primary: %s", e)
+    return replica_state["healthy"]
+
+
+async def replica_health_loop():
+    while True:
+        await check_replica_health()
+        await asyncio.sleep(REPLICA_HEALTH_INTERVAL)
+
 #fcn for creating tables based on sqlalchelmy mdoels
 async def create_db_tables():
     async with engine.begin() as conn:
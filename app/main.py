@@ -1,26 +1,63 @@
-from typing import Annotated
+from typing import Annotated, Optional
 from uuid import UUID
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Request, status
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
+from contextlib import asynccontextmanager
+from urllib.parse import parse_qsl
 import datetime, logging, asyncio
 
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import Response, RedirectResponse
 
 
-from .database import get_db
-from .models import User, Goal, DailyLog
-from .schemas import UserCreate, UserResponse, GoalResponse 
-from .utils.ai_utils import generate_openai_message
-from .utils import messaging_utils, email_utils
-
-
-
-app = FastAPI()
+# before the other app imports, several of them log while being imported
+from .utils.logging_utils import configure_logging, RequestIdMiddleware, debug_sampler
+configure_logging()
 
+from .database import get_db, get_read_db, mark_user_write, replica_engine, replica_health_loop, replica_state
+from .models import User, Goal, DailyLog
+from .schemas import UserCreate, UserResponse, DailyLogResponse, UserStatsResponse, DailyStatResponse, user_response_adapter, daily_logs_adapter
+from .utils.response_utils import orm_json_response
+from .utils.ai_utils import generate_openai_message, similarity_cache
+from .utils.llm_utils import router as llm_router, LLM_BACKENDS
+from .utils.prompt_utils import get_template, build_prompt_values, message_keys_for
+from .utils.schedule_utils import format_time_label, get_scheduled_times
+from .utils.archive_utils import fetch_user_logs
+from .utils import stats_utils
+from .utils.inbound_utils import inbound_writer, verify_twilio_signature, TWILIO_WEBHOOK_URL, EMPTY_TWIML
+from .utils.admission_utils import simulate_admission
+from .utils import email_utils, delivery_utils
+from .utils.static_utils import load_asset, asset_response, FRONTEND_INDEX, REVALIDATE_CACHE_CONTROL, IMMUTABLE_CACHE_CONTROL
+
+logger = logging.getLogger(__name__)
+
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    logger.info("LLM backends configured: %s", ", ".join(LLM_BACKENDS))
+    app.state.frontend = load_asset(FRONTEND_INDEX)
+    inbound_writer.start()
+    replica_monitor = asyncio.create_task(replica_health_loop()) if replica_engine else None
+    yield
+    if replica_monitor:
+        replica_monitor.cancel()
+        try:
+            await replica_monitor
+        except asyncio.CancelledError:
+            pass
+    await inbound_writer.stop()
+
+
+app = FastAPI(lifespan=lifespan)
+
+app.add_middleware(RequestIdMiddleware)
+# api json only, the frontend is precompressed and already carries Content-Encoding so it is passed through
+app.add_middleware(GZipMiddleware, minimum_size=1000)
 
 app.add_middleware(
     CORSMiddleware,
@@ -39,53 +76,36 @@ app.add_middleware(
 def health():
     return {"status": "ok"}
 
-def format_time_label(time_obj: datetime.time) -> str:
-    
-    if isinstance(time_obj, datetime.datetime):
-        time_obj = time_obj.time()
-    return time_obj.strftime('%I:%M %p').lstrip("0")
-
-def get_scheduled_times(start_time: datetime.time, end_time: datetime.time, trigger_time: datetime.time) -> dict:
-    today = datetime.date.today()
-    base = datetime.datetime.combine(today, start_time)
-    end = datetime.datetime.combine(today, end_time)
-    trigger = datetime.datetime.combine(today, trigger_time)
-    wind_down_time = end - datetime.timedelta(hours=1.5) 
-
-    
-    
-    start_minutes = start_time.hour * 60 + start_time.minute
-    end_minutes = end_time.hour * 60 + end_time.minute
-
-    
-    if end_minutes < start_minutes:
-        end_minutes += 24 * 60 
-
-    midpoint_minutes = start_minutes + (end_minutes - start_minutes) / 2
-    midday_hour = int(midpoint_minutes // 60) % 24 
-    midday_minute = int(midpoint_minutes % 60)
-
-    midday_push_time_obj = datetime.time(midday_hour, midday_minute)
-
-    return {
-        "morning": base,
-        "trigger": trigger,
-        "midday": datetime.datetime.combine(today, midday_push_time_obj),
-        "wind_down": wind_down_time
-    }
-
-
 @app.get("/")
 async def read_root():
     return {"message": "Sistema API Testing :)"}
 
+@app.get("/frontend")
+async def serve_frontend(request: Request):
+    frontend = request.app.state.frontend
+    if frontend is None:
+        raise HTTPException(status_code=404, detail="Frontend not found")
+    response = asset_response(request, frontend, REVALIDATE_CACHE_CONTROL)
+    response.headers["Content-Location"] = f"/frontend/{frontend.hashed_name}"
+    return response
+
+@app.get("/frontend/index.{content_hash}.html")
+async def serve_frontend_hashed(content_hash: str, request: Request):
+    frontend = request.app.state.frontend
+    if frontend is None:
+        raise HTTPException(status_code=404, detail="Frontend not found")
+    if content_hash != frontend.content_hash:
+        # an old build, send them to the current one
+        return RedirectResponse("/frontend", status_code=307, headers={"Cache-Control": REVALIDATE_CACHE_CONTROL})
+    return asset_response(request, frontend, IMMUTABLE_CACHE_CONTROL)
+
 @app.get("/test-db")
-async def test_db_connection(db: Annotated[AsyncSession, Depends(get_db)]):
+async def test_db_connection(db: Annotated[AsyncSession, Depends(get_read_db)]):
     try:
         result = await db.execute(text("SELECT NOW() as current_db_time;"))
         current_time = result.scalar_one()
-        print(f'Db test query: {current_time}')
-        return {"message": "DB connection successful!", "db_time": str(current_time)}
+        logger.debug("Db test query: %s", current_time)
+        return {"message": "DB connection successful!", "db_time": str(current_time), "replica": replica_state if replica_engine else None}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f'Db connection failed {str(e)}')
 
@@ -110,32 +130,14 @@ async def signup_user(user_data: UserCreate, db: Annotated[AsyncSession, Depends
         db.add(new_goal)
 
         await db.commit()
+        mark_user_write(new_user.id)
         await db.refresh(new_user)
         await db.refresh(new_goal)
 
-        return UserResponse(
-            id=new_user.id,
-            full_name=new_user.full_name,
-            email=new_user.email,
-            phone_number=new_user.phone_number,
-            timezone=new_user.timezone,
-            notification_preference=new_user.notification_preference,
-            daily_start_time=new_user.daily_start_time,
-            daily_end_time=new_user.daily_end_time,
-            trigger_type=new_user.trigger_type,
-            trigger_time=new_user.trigger_time,
-            trigger_habit=new_user.trigger_habit,
-            tone=new_user.tone,
-            buddy_name=new_user.buddy_name,
-            mantra=new_user.mantra,
-            is_hackathon_demo=new_user.is_hackathon_demo,
-            monday_hour_1_enabled=new_user.monday_hour_1_enabled,
-            monday_hour_1_day_of_week=new_user.monday_hour_1_day_of_week,
-            monday_hour_1_time=new_user.monday_hour_1_time,
-            created_at=new_user.created_at,
-            updated_at=new_user.updated_at,
-            goal=GoalResponse.model_validate(new_goal)
-        )
+        # loads User.goal for the response without a lazy load
+        await db.refresh(new_user, attribute_names=["goals"])
+
+        return orm_json_response(user_response_adapter, new_user, status_code=status.HTTP_201_CREATED)
 
     except HTTPException:
         raise
@@ -144,35 +146,59 @@ async def signup_user(user_data: UserCreate, db: Annotated[AsyncSession, Depends
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to create user or goal in database: {e}")
 
 @app.get("/users/{user_id}", response_model=UserResponse, status_code=status.HTTP_200_OK)
-async def get_user(user_id: UUID, db: Annotated[AsyncSession, Depends(get_db)]):
+async def get_user(user_id: UUID, db: Annotated[AsyncSession, Depends(get_read_db)]):
     result = await db.execute(select(User).options(selectinload(User.goals)).where(User.id == user_id))
     user = result.scalars().first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     if not user.goals:
         raise HTTPException(status_code=500, detail="User found but no associated goal found.")
-    return UserResponse(
-        id=user.id,
-        full_name=user.full_name,
-        email=user.email,
-        phone_number=user.phone_number,
-        timezone=user.timezone,
-        notification_preference=user.notification_preference,
-        daily_start_time=user.daily_start_time,
-        daily_end_time=user.daily_end_time,
-        trigger_type=user.trigger_type,
-        trigger_time=user.trigger_time,
-        trigger_habit=user.trigger_habit,
-        tone=user.tone,
-        buddy_name=user.buddy_name,
-        mantra=user.mantra,
-        is_hackathon_demo=user.is_hackathon_demo,
-        monday_hour_1_enabled=user.monday_hour_1_enabled,
-        monday_hour_1_day_of_week=user.monday_hour_1_day_of_week,
-        monday_hour_1_time=user.monday_hour_1_time,
-        created_at=user.created_at,
-        updated_at=user.updated_at,
-        goal=GoalResponse.model_validate(user.goals[0])
+    return orm_json_response(user_response_adapter, user)
+
+@app.get("/users/{user_id}/logs", response_model=list[DailyLogResponse], status_code=status.HTTP_200_OK)
+async def get_user_logs(
+    user_id: UUID,
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    start_date: Optional[datetime.date] = None,
+    end_date: Optional[datetime.date] = None,
+):
+    end_date = end_date or datetime.datetime.now(datetime.timezone.utc).date()
+    start_date = start_date or end_date - datetime.timedelta(days=7)
+    if start_date > end_date:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="start_date must be before end_date")
+    return orm_json_response(daily_logs_adapter, await fetch_user_logs(db, user_id, start_date, end_date))
+
+@app.get("/users/{user_id}/stats", response_model=UserStatsResponse, status_code=status.HTTP_200_OK)
+async def get_user_stats(user_id: UUID, db: Annotated[AsyncSession, Depends(get_read_db)], days: int = 30):
+    if days < 1 or days > 366:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="days must be between 1 and 366")
+
+    goal_result = await db.execute(select(Goal).where(Goal.user_id == user_id).order_by(Goal.id))
+    goal = goal_result.scalars().first()
+    if not goal:
+        raise HTTPException(status_code=404, detail="User or goal not found")
+
+    # stats rows are keyed on the utc date, see run_daily_simulation
+    end_date = datetime.datetime.now(datetime.timezone.utc).date()
+    start_date = end_date - datetime.timedelta(days=days - 1)
+    daily_stats = await stats_utils.get_daily_stats(db, user_id, start_date, end_date)
+
+    generated = sum(stat.messages_generated for stat in daily_stats)
+    sent = sum(stat.messages_sent for stat in daily_stats)
+    failed = sum(stat.messages_failed for stat in daily_stats)
+
+    return UserStatsResponse(
+        user_id=user_id,
+        start_date=start_date,
+        end_date=end_date,
+        messages_generated=generated,
+        messages_sent=sent,
+        messages_failed=failed,
+        send_success_rate=round(sent / (sent + failed), 4) if sent + failed else None,
+        current_streak=stats_utils.current_streak(daily_stats, end_date),
+        days_to_target=(goal.target_date - end_date).days if goal.target_date else None,
+        progress=goal.progress,
+        daily=[DailyStatResponse.model_validate(stat) for stat in daily_stats],
     )
 
 @app.post("/simulate-day/{user_id}", summary="Simulate a full day of personalized system prompts", response_model=dict)
@@ -180,19 +206,28 @@ async def simulate_daily_support(user_id: UUID, db: Annotated[AsyncSession, Depe
     """
     Simulates a day's system prompts based on user configuration and
     returns a preview of these messages for the frontend.
+    Runs behind simulate_admission, over capacity requests get a 429 + Retry-After.
     """
-    logging.info(f"DEBUG: Entering simulate_daily_support for user_id: {user_id}")
+    async with simulate_admission.slot(user_id):
+        return await run_daily_simulation(user_id, db)
+
+@app.get("/simulate-day/admission")
+async def simulate_admission_stats():
+    return simulate_admission.snapshot()
+
+async def run_daily_simulation(user_id: UUID, db: AsyncSession) -> dict:
+    logger.debug("Entering simulate_daily_support for user_id: %s", user_id)
     try:
-        logging.info("DEBUG: [1] Fetching user and goals from DB.")
+        logger.debug("[1] Fetching user and goals from DB.")
         user_query = await db.execute(select(User).options(selectinload(User.goals)).where(User.id == user_id))
         user = user_query.scalars().first()
-        logging.info("DEBUG: [1] User and goals fetched from DB.")
+        logger.debug("[1] User and goals fetched from DB.")
 
         if not user:
-            logging.warning(f"DEBUG: User {user_id} not found.")
+            logger.warning("User %s not found.", user_id)
             raise HTTPException(status_code=404, detail="User not found")
         if not user.goals:
-            logging.warning(f"DEBUG: User {user_id} has no associated goal.")
+            logger.warning("User %s has no associated goal.", user_id)
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="User must have at least one goal to run simulation.")
 
         goal_text = user.goals[0].description
@@ -215,160 +250,137 @@ async def simulate_daily_support(user_id: UUID, db: Annotated[AsyncSession, Depe
         
         scheduled_times_dt = get_scheduled_times(user.daily_start_time, user.daily_end_time, effective_trigger_time_for_scheduling)
 
-        prompts_and_configs = {
-            "daily_system_initiation": { 
-                "prompt": (
-                    f"Write a short motivational morning message for '{user.full_name}'. "
-                    f"Use the tone of '{user.tone}'. Their current goal is: '{goal_text}'. "
-                    f"Focus: Begin daily flow, set a positive tone. Keep it concise (30-40 words). "
-                    f"Avoid repeating their name in the body of the message."
-                ),
-                "base_label": "=== RISE N SHINE 🌄 ===", "emoji": "📜🤝",
-                "add_days_remaining": False, "send_time_key": "morning"
-            },
-            "core_output_trigger": { 
-                "prompt": (
-                    f"For '{user.full_name}', after this habit/time: '{user.trigger_habit or format_time_label(user.trigger_time)}', "
-                    f"remind them why they started working toward: '{goal_text}'. "
-                    f"Use the tone '{user.tone}' and make it action-oriented. "
-                    f"Do not mention their name in the message body. Keep it 30-40 words."
-                ),
-                "base_label": "=== TRIGGER 🔔 ===", "emoji": "🔔",
-                "add_days_remaining": True, "send_time_key": "trigger"
-            },
-            "midday_push": { 
-                "prompt": (
-                    f"Write a calming and energizing midday message for '{user.full_name}'. "
-                    f"The user’s mantra is: '{user.mantra or 'no mantra set'}'. "
-                    f"Use the tone '{user.tone}'. Focus on presence, purpose, and choosing to make today count. "
-                    f"Remind them life is a gift and they can still shape it. "
-                    f"Keep it between 30 to 40 words and avoid repeating their name."
-                ),
-                "base_label": "=== MIDDAY PUSH ⚡️ ===", "emoji": "⚡️",
-                "add_days_remaining": False, "send_time_key": "midday"
-            },
-            "daily_system_shutdown": { 
-                "prompt": (
-                    f"Write a reflective evening message for '{user.full_name}' in the tone of '{user.tone}'. "
-                    f"Prompt them to rate their day 1–10 and share one win related to their goal: '{goal_text}'. "
-                    f"Encourage jotting notes for clearing their mind and preparing for rest. "
-                    f"Do not include their name in the message. Keep it between 30-40 words."
-                ),
-                "base_label": "=== WINDDOWN 🌚 ===", "emoji": "🌙",
-                "add_days_remaining": False, "send_time_key": "wind_down"
-            },
-            "weekly_system_optimization": { 
-                "prompt": (
-                    f"Generate a concise 'Monday Hour 1' prompt for '{user.full_name}'. "
-                    f"Tone: '{user.tone}'. Goal: '{goal_text}'. "
-                    f"Focus: Review last week's system outputs and blueprint. Identify areas for optimization. "
-                    f"Encourage a focused planning session for the week ahead. Max 40 words."
-                ),
-                "base_label": "🗓️ Monday Hour 1", "emoji": "📝",
-                "add_days_remaining": False, "send_time_key": "weekly_override"
-            }
-        }
+        prompt_values = build_prompt_values(user, goal_text)
 
-        message_keys_order = [
-            "daily_system_initiation",
-            "core_output_trigger",
-            "midday_push",
-            "daily_system_shutdown"
-        ]
-        if user.monday_hour_1_enabled:
-            message_keys_order.append("weekly_system_optimization")
+        message_keys_order = message_keys_for(user)
 
         saved_daily_log_entries = [] 
         formatted_messages_for_frontend = [] 
+        slots = []
+
+        # messages pregenerated by the nightly batch (utils/batch_utils.py) only need delivering
+        pending_query = await db.execute(
+            select(DailyLog).where(
+                DailyLog.user_id == user.id,
+                DailyLog.date == naive_utc_datetime.date(),
+                DailyLog.sent_at.is_(None),
+            )
+        )
+        pregenerated_logs = {log.message_type: log for log in pending_query.scalars().all()}
 
         for msg_key in message_keys_order:
-            config = prompts_and_configs[msg_key]
-
-            logging.info(f"DEBUG: Generating '{msg_key}' message with OpenAI.")
-            
-            ai_text = generate_openai_message(config["prompt"])
+            template = get_template(msg_key)
+            prompt_variables = template.variables_for(prompt_values)
+
+            pregenerated_log = pregenerated_logs.get(msg_key)
+            # the user may have changed goal / tone / mantra since the nightly run (or the template got a new version)
+            pregenerated_is_current = (
+                pregenerated_log is not None
+                and pregenerated_log.prompt_template_hash == template.hash
+                and pregenerated_log.prompt_variables == prompt_variables
+            )
+            if pregenerated_is_current:
+                logger.debug("Using pregenerated '%s' message.", msg_key)
+                ai_text = pregenerated_log.message_content
+            else:
+                logger.debug("Generating '%s' message with the LLM router.", msg_key)
+                
+                # blocking sdk calls go to a thread so the admission caps actually bound concurrent work
+                ai_text = await asyncio.to_thread(
+                    generate_openai_message,
+                    template.render(prompt_variables),
+                    prompt_variables,
+                    template.hash,
+                    template.similarity_cache,
+                    template.model_tier,
+                )
             
 
             
             timestamp_dt = None
-            if config["send_time_key"] == "weekly_override":
+            if template.send_time_key == "weekly_override":
                 
                 weekly_time = user.monday_hour_1_time if user.monday_hour_1_time else datetime.time(18, 0)
                 timestamp_dt = datetime.datetime.combine(current_utc_datetime.date(), weekly_time)
             else:
-                timestamp_dt = scheduled_times_dt.get(config["send_time_key"])
+                timestamp_dt = scheduled_times_dt.get(template.send_time_key)
 
             timestamp_label = format_time_label(timestamp_dt.time()) if timestamp_dt else "N/A"
 
            
             full_msg_content = (
-                f"{config['base_label']}\n\n"
+                f"{template.base_label}\n\n"
                 f"{ai_text}"
-                f"{days_remaining_text if config['add_days_remaining'] else ''}"
+                f"{days_remaining_text if template.add_days_remaining else ''}"
                 f"\n\n🕒 Scheduled: {timestamp_label}\n\n"
-                f"– {user.buddy_name or 'System Feedback Loop'} {config['emoji']}"
+                f"– {user.buddy_name or 'System Feedback Loop'} {template.emoji}"
             )
 
-            
-            message_sent_successfully = False
-
-            
-            if user.notification_preference in ["sms", "both"] and user.phone_number:
-                try:
-                    message_sid = messaging_utils.send_sms(to_number=user.phone_number, body=full_msg_content)
-                    if message_sid: 
-                        message_sent_successfully = True
-                except Exception as e:
-                    logging.error(f"ERROR: SMS failed for {msg_key} (user: {user.id}): {e}", exc_info=True)
-
-            
-            if user.notification_preference in ["email", "both"] and user.email:
-                try:
-                    
-                    email_utils.send_email(
-                        to_email=user.email,
-                        message_type=config["base_label"],
-                        message_body=full_msg_content,
-                        buddy_name=user.buddy_name
-                    )
-                    message_sent_successfully = True 
-                except Exception as e:
-                    logging.error(f"ERROR: Email failed for {msg_key} (user: {user.id}): {e}", exc_info=True)
-            
-
-            
-            daily_log_entry = DailyLog(
-                user_id=user.id,
-                date=naive_utc_datetime.date(),
-                message_type=msg_key,
-                message_content=full_msg_content,
-                ai_prompt_used=config["prompt"],
-                sent_at=naive_utc_datetime, 
-                is_sent=message_sent_successfully 
-            )
-            db.add(daily_log_entry)
+            if pregenerated_log is not None:
+                daily_log_entry = pregenerated_log
+                daily_log_entry.message_content = full_msg_content
+                daily_log_entry.prompt_template_hash = template.hash
+                daily_log_entry.prompt_variables = prompt_variables
+            else:
+                daily_log_entry = DailyLog(
+                    user_id=user.id,
+                    date=naive_utc_datetime.date(),
+                    message_type=msg_key,
+                    message_content=full_msg_content,
+                    prompt_template_hash=template.hash,
+                    prompt_variables=prompt_variables,
+                    is_sent=False
+                )
+                db.add(daily_log_entry)
             saved_daily_log_entries.append(daily_log_entry)
 
+            slots.append({
+                "message_type": msg_key,
+                "base_label": template.base_label,
+                "content": full_msg_content,
+                "scheduled_at": timestamp_dt,
+                "log": daily_log_entry,
+            })
+
             
             formatted_messages_for_frontend.append({
-                "time": f"Simulated {config['base_label']} ({timestamp_label})",
+                "time": f"Simulated {template.base_label} ({timestamp_label})",
                 "content": full_msg_content,
                 "note": ""
             })
 
+        # one send per slot, or one per channel for slots close together when the user is on digest
+        deliveries = delivery_utils.group_into_deliveries(slots, user.delivery_policy, user.digest_window_minutes)
+        for index, group in enumerate(deliveries):
+            delivered, delivery_id = await asyncio.to_thread(delivery_utils.send_delivery, user, group)
+            for slot in group:
+                slot["log"].is_sent = delivered
+                slot["log"].sent_at = naive_utc_datetime
+                slot["log"].delivery_id = delivery_id
+
             
-            if user.is_hackathon_demo and msg_key != message_keys_order[-1]:
-                print(f"\n✅ Generated and attempting to send '{msg_key}' message... simulating delay...\n")
+            if user.is_hackathon_demo and index != len(deliveries) - 1:
+                logger.info("Demo mode: sent %s, simulating delay...", [slot['message_type'] for slot in group])
                 await asyncio.sleep(1) 
 
-        logging.info("DEBUG: [6] Committing new daily log entries to DB.")
+        sent_count = sum(1 for entry in saved_daily_log_entries if entry.is_sent)
+        await stats_utils.record_log_stats(
+            db, user.id, naive_utc_datetime.date(),
+            generated=len(saved_daily_log_entries),
+            sent=sent_count,
+            failed=len(saved_daily_log_entries) - sent_count,
+        )
+        await stats_utils.refresh_goal_progress(db, user.goals[0], naive_utc_datetime.date())
+
+        logger.debug("[6] Committing new daily log entries to DB.")
         await db.commit() 
-        logging.info("DEBUG: [6] Daily log entries committed.")
+        mark_user_write(user.id)
+        logger.debug("[6] Daily log entries committed.")
 
         
         for entry in saved_daily_log_entries:
             await db.refresh(entry)
-        logging.info("DEBUG: [7] Daily log entries refreshed.")
+        logger.debug("[7] Daily log entries refreshed.")
 
         return {
             "status": "success",
@@ -377,16 +389,53 @@ async def simulate_daily_support(user_id: UUID, db: Annotated[AsyncSession, Depe
         }
 
     except HTTPException:
-        logging.error("ERROR: HTTPException raised in simulate_daily_support.", exc_info=True)
+        logger.warning("HTTPException raised in simulate_daily_support.", exc_info=True)
         raise
     except Exception as e:
-        logging.error(f"ERROR: Unhandled exception in simulate_daily_support: {e}", exc_info=True)
+        logger.error("Unhandled exception in simulate_daily_support: %s", e, exc_info=True)
         await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Simulation failed: {e}"
         )
 
+@app.post("/sms/inbound", summary="Twilio webhook for inbound SMS replies")
+async def receive_inbound_sms(request: Request):
+    """
+    only verifies and enqueues the reply, inbound_writer writes them to
+    user_messages in batches so this can ack right away under bursts
+    """
+    raw_body = await request.body()
+    params = dict(parse_qsl(raw_body.decode("utf-8"), keep_blank_values=True))
+
+    url = TWILIO_WEBHOOK_URL or str(request.url)
+    if not verify_twilio_signature(url, params, request.headers.get("X-Twilio-Signature")):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid Twilio signature")
+
+    if not params.get("From"):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Missing From number")
+
+    if not inbound_writer.enqueue(params["From"], params.get("Body", "")):
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Inbound queue is not accepting messages", headers={"Retry-After": "5"})
+
+    return Response(content=EMPTY_TWIML, media_type="application/xml")
+
+@app.get("/sms/inbound/stats")
+async def inbound_sms_stats():
+    return {"queue_depth": inbound_writer.queue.qsize(), **inbound_writer.stats}
+
+@app.get("/metrics/prompt-cache")
+async def prompt_cache_stats():
+    return similarity_cache.snapshot()
+
+@app.get("/metrics/llm")
+async def llm_router_stats():
+    return llm_router.snapshot()
+
+@app.get("/metrics/logging")
+async def logging_stats():
+    return {"debug_records_dropped": debug_sampler.dropped, "debug_rate_per_logger": debug_sampler.rate}
+
 @app.post("/send-test-email/{user_id}")
 async def send_test_email_to_user(user_id: UUID, db: Annotated[AsyncSession, Depends(get_db)]):
     try:
@@ -416,7 +465,7 @@ async def send_test_email_to_user(user_id: UUID, db: Annotated[AsyncSession, Dep
         return {"status": "sent", "to": user.email}
 
     except Exception as e:
-        logging.error(f"Email test failed: {e}", exc_info=True)
+        logger.error("Email test failed: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Failed to send test email: {e}")
     
 
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Boolean, Time, Date, Text, ForeignKey, UUID, DateTime, Integer # Keep Integer for other models if needed
+from sqlalchemy import Column, String, Boolean, Time, Date, Text, ForeignKey, UUID, DateTime, Integer, JSON, Index # Keep Integer for other models if needed
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
@@ -16,6 +16,8 @@ class User(Base):
     phone_number = Column(String(20), unique=True, index=True)
     timezone = Column(String(50), nullable=False)
     notification_preference = Column(String(10), nullable=False)
+    delivery_policy = Column(String(10), nullable=False, default="immediate", server_default="immediate")
+    digest_window_minutes = Column(Integer, nullable=False, default=60, server_default="60")
 
     daily_start_time = Column(Time, nullable=False)
     daily_end_time = Column(Time, nullable=False)
@@ -40,6 +42,12 @@ class User(Base):
     goals = relationship('Goal', back_populates="user", cascade="all, delete-orphan")
     daily_logs = relationship("DailyLog", back_populates="user", cascade="all, delete-orphan")
     user_messages = relationship("UserMessage", back_populates="user", cascade="all, delete-orphan") # ADDED CASCADE
+    daily_stats = relationship("UserDailyStat", back_populates="user", cascade="all, delete-orphan")
+
+    @property
+    def goal(self):
+        """the user's current goal, lets UserResponse validate straight from the ORM row"""
+        return self.goals[0] if self.goals else None
 
     def __repr__(self):
         return f"<User(id={self.id}, email='{self.email}')>"
@@ -58,17 +66,56 @@ class Goal(Base):
 
 class DailyLog(Base): 
     __tablename__ = "daily_logs"
-    id = Column(Integer, primary_key=True, index=True)
+    # monthly range partitions on date, partitions are managed by utils/archive_utils.py
+    __table_args__ = (
+        Index("ix_daily_logs_user_id_date", "user_id", "date"),
+        {"postgresql_partition_by": "RANGE (date)"},
+    )
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id")) 
-    date = Column(Date, index=True)
+    date = Column(Date, primary_key=True, index=True) # partition key has to be part of the pk
     message_type = Column(String)
     message_content = Column(String)
-    ai_prompt_used = Column(String)
+    ai_prompt_used = Column(String) # legacy rows only, new rows store the template hash + variables
+    prompt_template_hash = Column(String(16), nullable=True)
+    prompt_variables = Column(JSON, nullable=True)
     sent_at = Column(DateTime, nullable=True)
     is_sent = Column(Boolean, default=False)
+    delivery_id = Column(String(32), nullable=True) # shared by every slot that went out in the same send
     user = relationship("User", back_populates="daily_logs")
 
 
+class ArchivedDailyLog(Base):
+    """plain (unpartitioned, uncompressed) table for daily_logs partitions past the retention window"""
+    __tablename__ = "daily_logs_archive"
+    __table_args__ = (
+        Index("ix_daily_logs_archive_user_id_date", "user_id", "date"),
+    )
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"))
+    date = Column(Date, primary_key=True)
+    message_type = Column(String)
+    message_content = Column(String)
+    ai_prompt_used = Column(String)
+    prompt_template_hash = Column(String(16), nullable=True)
+    prompt_variables = Column(JSON, nullable=True)
+    sent_at = Column(DateTime, nullable=True)
+    is_sent = Column(Boolean, default=False)
+    delivery_id = Column(String(32), nullable=True)
+
+
+class UserDailyStat(Base):
+    """per user, per day counters kept up to date as daily_logs are written (see utils/stats_utils.py)"""
+    __tablename__ = "user_daily_stats"
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    date = Column(Date, primary_key=True)
+    messages_generated = Column(Integer, nullable=False, default=0, server_default="0")
+    messages_sent = Column(Integer, nullable=False, default=0, server_default="0")
+    messages_failed = Column(Integer, nullable=False, default=0, server_default="0")
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now())
+    user = relationship("User", back_populates="daily_stats")
+
+
 class UserMessage(Base):
     __tablename__ = "user_messages" 
 
@@ -1,9 +1,12 @@
 # app/schemas.py (Ensure this content is in your file!)
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field, TypeAdapter, field_validator, model_validator
 from datetime import time, date, datetime
 from typing import Optional, Literal
 import uuid # Keep this for UUID fields in other schemas
 
+from .utils.prompt_utils import reconstruct_prompt
+from .utils.phone_utils import normalize_phone_number
+
 # Pydantic Model for Goal creation
 class GoalCreate(BaseModel):
     goal_text: str = Field(..., min_length=1, max_length=1000)
@@ -20,6 +23,8 @@ class UserCreate(BaseModel):
     phone_number: Optional[str] = Field(None, max_length=20)
     timezone: str = Field(..., max_length=50)
     notification_preference: Literal['sms', 'email', 'both']
+    delivery_policy: Literal['immediate', 'digest'] = 'immediate'
+    digest_window_minutes: int = Field(60, ge=1, le=1440)
 
     daily_start_time: time
     daily_end_time: time
@@ -40,6 +45,17 @@ class UserCreate(BaseModel):
 
     goal: GoalCreate
 
+    @field_validator("phone_number")
+    @classmethod
+    def normalize_phone(cls, value: Optional[str]) -> Optional[str]:
+        # stored as E.164 so inbound twilio From numbers match it as-is
+        if value is None or not value.strip():
+            return None
+        normalized = normalize_phone_number(value)
+        if normalized is None:
+            raise ValueError("phone_number must be a valid phone number")
+        return normalized
+
     class Config:
         from_attributes = True
 
@@ -67,7 +83,7 @@ class UserResponse(UserCreate):
     class Config:
         from_attributes = True
 
-# Pydantic Model for DailyLog (for future use, e.g., viewing logs)
+# Pydantic Model for DailyLog (GET /users/{user_id}/logs)
 class DailyLogResponse(BaseModel): 
     id: int 
     user_id: uuid.UUID
@@ -75,13 +91,53 @@ class DailyLogResponse(BaseModel):
     message_type: str
     message_content: str
     ai_prompt_used: Optional[str] = None 
+    prompt_template_hash: Optional[str] = None
+    prompt_variables: Optional[dict] = None
     sent_at: Optional[datetime] = None 
     is_sent: Optional[bool] = None 
+    delivery_id: Optional[str] = None
     reflection_text: Optional[str] = None
     rating_score: Optional[int] = Field(None, ge=1, le=10)
     # log_type: Literal['daily_reflection', 'monday_hour_1'] 
                                                             
                                                             
 
+    @model_validator(mode="after")
+    def fill_prompt_used(self):
+        # new rows only store the template hash + variables, rebuild the prompt so
+        # clients get ai_prompt_used the same way for old and new rows
+        if self.ai_prompt_used is None:
+            self.ai_prompt_used = reconstruct_prompt(self)
+        return self
+
+    class Config:
+        from_attributes = True
+
+# Pydantic Model for one day of UserDailyStat
+class DailyStatResponse(BaseModel):
+    date: date
+    messages_generated: int
+    messages_sent: int
+    messages_failed: int
+
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# Pydantic Model for the stats endpoint
+class UserStatsResponse(BaseModel):
+    user_id: uuid.UUID
+    start_date: date
+    end_date: date
+    messages_generated: int
+    messages_sent: int
+    messages_failed: int
+    send_success_rate: Optional[float] = None
+    current_streak: int
+    days_to_target: Optional[int] = None
+    progress: Optional[str] = None
+    daily: list[DailyStatResponse]
+
+
+# compiled once, used to go straight from ORM rows to JSON bytes (see utils/response_utils.py)
+user_response_adapter = TypeAdapter(UserResponse)
+daily_logs_adapter = TypeAdapter(list[DailyLogResponse])
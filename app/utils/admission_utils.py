@@ -0,0 +1,89 @@
+import os
+import math
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Hashable
+
+from fastapi import HTTPException, status
+
+SIMULATE_MAX_CONCURRENCY = int(os.getenv("SIMULATE_MAX_CONCURRENCY", "4"))
+SIMULATE_MAX_PER_USER = int(os.getenv("SIMULATE_MAX_PER_USER", "1"))
+SIMULATE_MAX_QUEUE = int(os.getenv("SIMULATE_MAX_QUEUE", "16"))
+SIMULATE_QUEUE_TIMEOUT = float(os.getenv("SIMULATE_QUEUE_TIMEOUT", "10"))
+
+
+class AdmissionController:
+    """
+    caps how many expensive requests run at once. requests over the cap wait in a
+    bounded queue, and anything that can't get a slot in time is shed with a 429
+    instead of piling up on the db pool / llm quota
+    """
+
+    def __init__(self, max_concurrency: int, max_per_user: int, max_queue: int, queue_timeout: float):
+        self.max_concurrency = max_concurrency
+        self.max_per_user = max_per_user
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.per_user: dict = {}
+        self.in_flight = 0
+        self.waiting = 0
+        self.stats = {"admitted": 0, "shed_queue_full": 0, "shed_timeout": 0, "shed_per_user": 0}
+
+    def reject(self, reason: str, retry_after: float) -> HTTPException:
+        self.stats[reason] += 1
+        return HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Server is busy, try again shortly.",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+    @asynccontextmanager
+    async def slot(self, key: Hashable):
+        if self.per_user.get(key, 0) >= self.max_per_user:
+            raise self.reject("shed_per_user", self.queue_timeout)
+
+        self.per_user[key] = self.per_user.get(key, 0) + 1
+        try:
+            if self.semaphore.locked():
+                if self.waiting >= self.max_queue:
+                    raise self.reject("shed_queue_full", self.queue_timeout)
+                self.waiting += 1
+                try:
+                    await asyncio.wait_for(self.semaphore.acquire(), self.queue_timeout)
+                except asyncio.TimeoutError:
+                    raise self.reject("shed_timeout", self.queue_timeout)
+                finally:
+                    self.waiting -= 1
+            else:
+                await self.semaphore.acquire()
+
+            self.in_flight += 1
+            self.stats["admitted"] += 1
+            try:
+                yield
+            finally:
+                self.in_flight -= 1
+                self.semaphore.release()
+        finally:
+            self.per_user[key] -= 1
+            if not self.per_user[key]:
+                del self.per_user[key]
+
+    def snapshot(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_per_user": self.max_per_user,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            **self.stats,
+        }
+
+
+simulate_admission = AdmissionController(
+    max_concurrency=SIMULATE_MAX_CONCURRENCY,
+    max_per_user=SIMULATE_MAX_PER_USER,
+    max_queue=SIMULATE_MAX_QUEUE,
+    queue_timeout=SIMULATE_QUEUE_TIMEOUT,
+)
@@ -1,42 +1,241 @@
 import os
+import re
+import time
+import random
+import hashlib
 import logging
+import threading
+from collections import OrderedDict
+from typing import Optional
 from dotenv import load_dotenv
-from openai import OpenAI
-from openai.types.chat import ChatCompletion
-
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 load_dotenv()
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    raise ValueError("OPENAI_API_KEY is not set in your environment variables.")
-logging.info(f"OpenAI API key loaded (first 5 chars): {OPENAI_API_KEY[:5]}")
+from .llm_utils import router, openai_client, OPENAI_MODELS
+from .logging_utils import configure_logging
 
-client = OpenAI(api_key=OPENAI_API_KEY)
+logger = logging.getLogger(__name__)
 
-MODEL = "gpt-4o"
+# the batch pipeline talks to openai directly
+client = openai_client
 
-def generate_openai_message(prompt: str) -> str:
-    full_prompt = (
-        f"{prompt} Keep it between 30 to 40 words. Avoid repeating greetings or overly generic phrases."
-    )
-    logging.info(f"Generating response for prompt: {prompt[:80]}...")
+MODEL = OPENAI_MODELS["large"]
+
+# opt-in near-duplicate cache, prompts of the same template + tone whose goal / mantra / trigger
+# are near-identical share a response
+SIMILARITY_CACHE_ENABLED = os.getenv("SIMILARITY_CACHE_ENABLED", "false").lower() == "true"
+SIMILARITY_CACHE_THRESHOLD = float(os.getenv("SIMILARITY_CACHE_THRESHOLD", "0.8"))
+SIMILARITY_CACHE_MAX_ENTRIES = int(os.getenv("SIMILARITY_CACHE_MAX_ENTRIES", "5000"))
+SIMILARITY_CACHE_TTL = float(os.getenv("SIMILARITY_CACHE_TTL", "86400"))
+# these have to match exactly, they are part of the cache scope and never scored
+SIMILARITY_EXACT_FIELDS = ("tone",)
+# swapped for placeholders, neither scored nor part of the scope
+SIMILARITY_PERSONAL_FIELDS = ("full_name",)
+# single-word values shorter than this are too likely to be ordinary words ("Will", "Run") to swap safely
+PLACEHOLDER_MIN_LENGTH = 6
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_MERSENNE_PRIME = (1 << 61) - 1
+
+
+def shingle(text: str, size: int = 3) -> frozenset:
+    """word n-grams after lowercasing and dropping punctuation, so 'Run a marathon.' == 'run a marathon'"""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) <= size:
+        return frozenset([" ".join(words)])
+    return frozenset(" ".join(words[i:i + size]) for i in range(len(words) - size + 1))
+
+
+def variable_shingles(variables: dict) -> frozenset:
+    """shingles of the values only, tagged with the field name so a goal never matches a mantra"""
+    return frozenset(f"{name}:{gram}" for name, value in variables.items() for gram in shingle(str(value or "")))
+
+
+class MinHashLSHCache:
+    """
+    in-memory MinHash + LSH banding index. banding only finds candidates,
+    a hit still needs the exact jaccard similarity of the shingle sets to reach the threshold.
+    entries are partitioned by scope (template hash + exact fields), entries of another scope are never candidates
+    """
+
+    def __init__(self, threshold: float, num_perm: int = 64, bands: int = 16, max_entries: int = 5000, ttl: float = 86400):
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.max_entries = max_entries
+        self.ttl = ttl
+        rng = random.Random(1337)
+        self.permutations = [(rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME)) for _ in range(num_perm)]
+        self.entries: OrderedDict = OrderedDict()
+        self.buckets: dict = {}
+        self.next_id = 0
+        self.lock = threading.Lock()
+        self.stats = {"lookups": 0, "exact_hits": 0, "similar_hits": 0, "misses": 0, "evictions": 0, "stores_skipped": 0}
+
+    def band_keys(self, scope: tuple, shingles: frozenset) -> list:
+        hashes = [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big") for s in shingles]
+        signature = [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in self.permutations]
+        return [(scope, band, tuple(signature[band * self.rows:(band + 1) * self.rows])) for band in range(self.bands)]
+
+    def remove(self, entry_id: int) -> None:
+        entry = self.entries.pop(entry_id)
+        for key in entry["band_keys"]:
+            bucket = self.buckets.get(key)
+            if bucket:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self.buckets[key]
+
+    def lookup(self, scope: tuple, variables: dict) -> Optional[str]:
+        shingles = variable_shingles(variables)
+        band_keys = self.band_keys(scope, shingles)
+        now = time.monotonic()
+        with self.lock:
+            self.stats["lookups"] += 1
+            candidates = set()
+            for key in band_keys:
+                candidates.update(self.buckets.get(key, ()))
+
+            best_id, best_score = None, 0.0
+            for entry_id in candidates:
+                entry = self.entries[entry_id]
+                if now - entry["created_at"] > self.ttl:
+                    self.remove(entry_id)
+                    continue
+                score = len(shingles & entry["shingles"]) / len(shingles | entry["shingles"])
+                if score > best_score:
+                    best_id, best_score = entry_id, score
+
+            if best_id is None or best_score < self.threshold:
+                self.stats["misses"] += 1
+                return None
+            self.stats["exact_hits" if best_score == 1.0 else "similar_hits"] += 1
+            self.entries.move_to_end(best_id)
+            return self.entries[best_id]["response"]
+
+    def store(self, scope: tuple, variables: dict, response: str) -> None:
+        shingles = variable_shingles(variables)
+        band_keys = self.band_keys(scope, shingles)
+        with self.lock:
+            while len(self.entries) >= self.max_entries:
+                self.remove(next(iter(self.entries)))
+                self.stats["evictions"] += 1
+            entry_id = self.next_id
+            self.next_id += 1
+            self.entries[entry_id] = {
+                "shingles": shingles,
+                "band_keys": band_keys,
+                "response": response,
+                "created_at": time.monotonic(),
+            }
+            for key in band_keys:
+                self.buckets.setdefault(key, set()).add(entry_id)
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            hits = self.stats["exact_hits"] + self.stats["similar_hits"]
+            return {
+                "enabled": SIMILARITY_CACHE_ENABLED,
+                "threshold": self.threshold,
+                "entries": len(self.entries),
+                "hit_rate": round(hits / self.stats["lookups"], 4) if self.stats["lookups"] else None,
+                **self.stats,
+            }
+
+
+similarity_cache = MinHashLSHCache(
+    threshold=SIMILARITY_CACHE_THRESHOLD,
+    max_entries=SIMILARITY_CACHE_MAX_ENTRIES,
+    ttl=SIMILARITY_CACHE_TTL,
+)
+
+
+def similarity_key(template_hash: str, prompt_variables: dict) -> tuple:
+    """returns (scope, scored variables). the fixed template text is left out on purpose, it would dominate the score"""
+    scope = (template_hash,) + tuple(prompt_variables.get(name) for name in SIMILARITY_EXACT_FIELDS)
+    scored = {
+        name: value for name, value in sorted(prompt_variables.items())
+        if name not in SIMILARITY_EXACT_FIELDS and name not in SIMILARITY_PERSONAL_FIELDS
+    }
+    return scope, scored
+
+
+def _placeholder_fields(prompt_variables: Optional[dict]) -> list:
+    # longest first so a name inside a goal doesn't get replaced half way
+    fields = [(name, str(value)) for name, value in (prompt_variables or {}).items() if value and name not in SIMILARITY_EXACT_FIELDS]
+    return sorted(fields, key=lambda item: len(item[1]), reverse=True)
+
+
+def depersonalize(text: str, prompt_variables: Optional[dict]) -> Optional[str]:
+    """
+    swaps the user's own values (name, goal, mantra, trigger) in a response for <field>
+    placeholders, exact case-sensitive whole-word matches only. returns None when a value
+    shows up in a way that can't be told apart from ordinary words (a short single word,
+    or a different casing, e.g. full_name "Will" next to "you will"), that response must not be cached
+    """
+    for name, value in _placeholder_fields(prompt_variables):
+        pattern = rf"(?<!\w){re.escape(value)}(?!\w)"
+        loose = len(re.findall(pattern, text, flags=re.IGNORECASE))
+        if not loose:
+            continue
+        exact = len(re.findall(pattern, text))
+        if exact != loose or (len(value.split()) < 2 and len(value) < PLACEHOLDER_MIN_LENGTH):
+            return None
+        text = re.sub(pattern, f"<{name}>", text)
+    return text
+
+
+def personalize(text: str, prompt_variables: Optional[dict]) -> str:
+    for name, value in (prompt_variables or {}).items():
+        if value:
+            text = text.replace(f"<{name}>", str(value))
+    return text
+
+
+def build_full_prompt(prompt: str) -> str:
+    return f"{prompt} Keep it between 30 to 40 words. Avoid repeating greetings or overly generic phrases."
+
+
+def generate_openai_message(
+    prompt: str,
+    prompt_variables: Optional[dict] = None,
+    template_hash: Optional[str] = None,
+    use_similarity_cache: bool = True,
+    model_tier: str = "large",
+) -> str:
+    """
+    the similarity cache is only used for template prompts (template_hash + prompt_variables):
+    a cached response is a candidate only for the same template and tone, and only the
+    variable values are compared. the user's values are swapped back into a cached response.
+    model_tier ("small" / "large") picks the model size on whichever backend the router chooses
+    """
+    cache_scope = scored = None
+    if SIMILARITY_CACHE_ENABLED and use_similarity_cache and template_hash and prompt_variables:
+        cache_scope, scored = similarity_key(template_hash, prompt_variables)
+        cached = similarity_cache.lookup(cache_scope, scored)
+        if cached is not None:
+            logger.debug("Similarity cache hit for prompt: %.80s...", prompt)
+            return personalize(cached, prompt_variables)
+
+    full_prompt = build_full_prompt(prompt)
+    logger.debug("Generating response for prompt: %.80s...", prompt)
 
     try:
-        response = client.chat.completions.create(
-            model=MODEL,
-            messages=[{"role": "user", "content": full_prompt}],
-            stream=False
-        )
-        message = response.choices[0].message.content
-        logging.info("OpenAI response successfully received.")
+        message, backend_name = router.complete(full_prompt, model_tier)
+        logger.debug("LLM response successfully received from %s.", backend_name)
+        if cache_scope is not None and message:
+            template_response = depersonalize(message, prompt_variables)
+            if template_response is None:
+                with similarity_cache.lock:
+                    similarity_cache.stats["stores_skipped"] += 1
+            else:
+                similarity_cache.store(cache_scope, scored, template_response)
         return message
     except Exception as e:
-        logging.error(f"OpenAI generation failed: {e}", exc_info=True)
+        logger.error("LLM generation failed: %s", e, exc_info=True)
         return "Oops, something went wrong generating your message."
 def test_openai_generation():
-    logging.info("Running test_openai_generation...")
+    logger.info("Running test_openai_generation...")
     test_prompt = (
         "Write a short, encouraging motivational quote for someone who is working towards a goal. "
         "Feel free to start with words from Kobe Bryant or other inspirational figures."
@@ -45,4 +244,5 @@ def test_openai_generation():
     print(f"\n 🎯 OpenAI Response:\n{message}\n")
 
 if __name__ == "__main__":
+    configure_logging()
     test_openai_generation()
\ No newline at end of file
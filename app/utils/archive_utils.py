@@ -0,0 +1,212 @@
+import os
+import re
+import asyncio
+import logging
+import datetime
+from uuid import UUID
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from ..database import engine
+from ..models import DailyLog, ArchivedDailyLog
+from .logging_utils import configure_logging
+
+logger = logging.getLogger(__name__)
+
+# how many months of daily_logs stay in the hot partitioned table
+RETENTION_MONTHS = int(os.getenv("DAILY_LOGS_RETENTION_MONTHS", "6"))
+# partitions are created this many months ahead so inserts never land in the default partition
+PARTITIONS_AHEAD = int(os.getenv("DAILY_LOGS_PARTITIONS_AHEAD", "2"))
+
+# the detach is the only step that locks daily_logs itself, give up quickly instead of queueing hot-path queries behind it
+ARCHIVE_LOCK_TIMEOUT = os.getenv("DAILY_LOGS_ARCHIVE_LOCK_TIMEOUT", "5s")
+
+PARTITION_NAME_RE = re.compile(r"^daily_logs_(\d{4})_(\d{2})$")
+
+LOG_COLUMNS = (
+    "id, user_id, date, message_type, message_content, ai_prompt_used, "
+    "prompt_template_hash, prompt_variables, sent_at, is_sent, delivery_id"
+)
+
+
+def month_start(day: datetime.date) -> datetime.date:
+    return day.replace(day=1)
+
+
+def add_months(day: datetime.date, months: int) -> datetime.date:
+    month_index = day.year * 12 + (day.month - 1) + months
+    return datetime.date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def partition_name(month: datetime.date) -> str:
+    return f"daily_logs_{month:%Y_%m}"
+
+
+def utc_today() -> datetime.date:
+    # daily_logs.date is written as the utc date
+    return datetime.datetime.now(datetime.timezone.utc).date()
+
+
+def hot_cutoff(today: Optional[datetime.date] = None) -> datetime.date:
+    """first date that is still guaranteed to live in the hot table"""
+    today = today or utc_today()
+    return add_months(month_start(today), -RETENTION_MONTHS)
+
+
+async def create_partition(conn, start: datetime.date) -> int:
+    """
+    creates the partition for one month. rows for that month that already landed in
+    daily_logs_default (maintenance didn't run in time) are moved into it first,
+    a plain CREATE ... PARTITION OF would fail on them. returns the number of rows moved
+    """
+    name = partition_name(start)
+    end = add_months(start, 1)
+    await conn.execute(text(f"CREATE TABLE {name} (LIKE daily_logs INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    result = await conn.execute(text(
+        f"WITH moved AS (DELETE FROM daily_logs_default WHERE date >= :start AND date < :end RETURNING {LOG_COLUMNS}) "
+        f"INSERT INTO {name} ({LOG_COLUMNS}) SELECT {LOG_COLUMNS} FROM moved"
+    ), {"start": start, "end": end})
+    await conn.execute(text(
+        f"ALTER TABLE daily_logs ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    ))
+    if result.rowcount:
+        logger.warning("Moved %d rows out of daily_logs_default into %s", result.rowcount, name)
+    return result.rowcount
+
+
+async def ensure_partitions(conn, today: Optional[datetime.date] = None, months_ahead: int = PARTITIONS_AHEAD) -> int:
+    """
+    creates the partitions from this month to months_ahead, plus one for every month
+    that has rows sitting in daily_logs_default. returns how many rows are still left
+    in the default partition afterwards, anything above 0 needs a look
+    """
+    current = month_start(today or utc_today())
+    months = {add_months(current, offset) for offset in range(months_ahead + 1)}
+    result = await conn.execute(text("SELECT DISTINCT date_trunc('month', date)::date FROM daily_logs_default"))
+    months.update(month for (month,) in result)
+
+    existing = {month for _, month in await list_partitions(conn)}
+    for start in sorted(months - existing):
+        await create_partition(conn, start)
+
+    default_rows = (await conn.execute(text("SELECT count(*) FROM daily_logs_default"))).scalar_one()
+    if default_rows:
+        logger.error("daily_logs_default still holds %d rows after partition maintenance", default_rows)
+    return default_rows
+
+
+async def list_partitions(conn) -> list:
+    result = await conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = 'daily_logs'"
+    ))
+    partitions = []
+    for (name,) in result:
+        match = PARTITION_NAME_RE.match(name)
+        if match:
+            partitions.append((name, datetime.date(int(match.group(1)), int(match.group(2)), 1)))
+    return sorted(partitions, key=lambda item: item[1])
+
+
+async def list_detached(conn) -> list:
+    """monthly tables left detached by a run that failed before it could drop them"""
+    result = await conn.execute(text(
+        "SELECT relname FROM pg_class WHERE relkind = 'r' AND NOT relispartition "
+        "AND relname ~ '^daily_logs_[0-9]{4}_[0-9]{2}$'"
+    ))
+    return sorted(name for (name,) in result)
+
+
+def _copy_to_archive_sql(name: str) -> str:
+    # idempotent, a retried run only fills in what is missing / changed since the first copy
+    return (
+        f"INSERT INTO daily_logs_archive ({LOG_COLUMNS}) SELECT {LOG_COLUMNS} FROM {name} "
+        "ON CONFLICT (id, date) DO UPDATE SET "
+        "message_content = EXCLUDED.message_content, sent_at = EXCLUDED.sent_at, "
+        "is_sent = EXCLUDED.is_sent, delivery_id = EXCLUDED.delivery_id "
+        "WHERE (daily_logs_archive.message_content, daily_logs_archive.sent_at, daily_logs_archive.is_sent, daily_logs_archive.delivery_id) "
+        "IS DISTINCT FROM (EXCLUDED.message_content, EXCLUDED.sent_at, EXCLUDED.is_sent, EXCLUDED.delivery_id)"
+    )
+
+
+async def finish_archive(name: str) -> int:
+    """copies whatever a detached table still has that the archive doesn't, then drops it"""
+    async with engine.begin() as conn:
+        result = await conn.execute(text(_copy_to_archive_sql(name)))
+        await conn.execute(text(f"DROP TABLE {name}"))
+    return result.rowcount
+
+
+async def archive_partition(name: str) -> int:
+    """
+    moves one monthly partition into daily_logs_archive without holding a lock on
+    daily_logs for the copy:
+    1. bulk copy while still attached, only a read lock on the partition itself
+    2. detach in its own short transaction (ACCESS EXCLUSIVE on daily_logs, no copying inside)
+    3. catch up on rows written / changed in between and drop the detached table
+    a failure after 2 is picked up by the next run via list_detached()
+    """
+    async with engine.begin() as conn:
+        result = await conn.execute(text(_copy_to_archive_sql(name)))
+    copied = result.rowcount
+
+    async with engine.begin() as conn:
+        await conn.execute(text(f"SET LOCAL lock_timeout = '{ARCHIVE_LOCK_TIMEOUT}'"))
+        await conn.execute(text(f"ALTER TABLE daily_logs DETACH PARTITION {name}"))
+
+    return copied + await finish_archive(name)
+
+
+async def run_maintenance(today: Optional[datetime.date] = None) -> dict:
+    today = today or utc_today()
+    cutoff = hot_cutoff(today)
+
+    async with engine.begin() as conn:
+        default_rows = await ensure_partitions(conn, today)
+        partitions = await list_partitions(conn)
+        detached = await list_detached(conn)
+
+    archived = {}
+    for name in detached:
+        archived[name] = await finish_archive(name)
+        logger.info("Finished archiving detached table %s (%d rows)", name, archived[name])
+    for name, month in partitions:
+        if month < cutoff:
+            archived[name] = await archive_partition(name)
+            logger.info("Archived partition %s (%d rows)", name, archived[name])
+
+    return {"cutoff": cutoff.isoformat(), "archived": archived, "default_partition_rows": default_rows}
+
+
+async def fetch_user_logs(db: AsyncSession, user_id: UUID, start_date: datetime.date, end_date: datetime.date) -> list:
+    """
+    log history for a user between start_date and end_date (inclusive).
+    recent ranges only touch the hot partitions, older ones fall back to the archive
+    """
+    hot_result = await db.execute(
+        select(DailyLog)
+        .where(DailyLog.user_id == user_id, DailyLog.date >= start_date, DailyLog.date <= end_date)
+        .order_by(DailyLog.date, DailyLog.id)
+    )
+    logs = list(hot_result.scalars().all())
+
+    if start_date < hot_cutoff():
+        archive_result = await db.execute(
+            select(ArchivedDailyLog)
+            .where(ArchivedDailyLog.user_id == user_id, ArchivedDailyLog.date >= start_date, ArchivedDailyLog.date <= end_date)
+            .order_by(ArchivedDailyLog.date, ArchivedDailyLog.id)
+        )
+        logs = list(archive_result.scalars().all()) + logs
+
+    return logs
+
+
+if __name__ == "__main__":
+    configure_logging()
+    print(asyncio.run(run_maintenance()))
@@ -0,0 +1,183 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import datetime
+from uuid import UUID
+from typing import Optional
+
+from sqlalchemy import delete
+from sqlalchemy.future import select
+from sqlalchemy.orm import selectinload
+
+from ..database import AsyncSessionLocal
+from ..models import User, Goal, DailyLog
+from .ai_utils import client, build_full_prompt
+from .llm_utils import OPENAI_MODELS
+from .prompt_utils import get_template, build_prompt_values, message_keys_for
+from .logging_utils import configure_logging
+
+logger = logging.getLogger(__name__)
+
+# set OPENAI_BASE_URL (read by the openai sdk) to point this at a local stand-in,
+# e.g. python -m app.utils.fake_openai_server
+BATCH_DIR = os.getenv("BATCH_DIR", "batches")
+BATCH_POLL_INTERVAL = float(os.getenv("BATCH_POLL_INTERVAL", "60"))
+BATCH_TIMEOUT = float(os.getenv("BATCH_TIMEOUT", str(24 * 60 * 60)))
+BATCH_ENDPOINT = "/v1/chat/completions"
+
+
+def make_custom_id(user_id: UUID, target_date: datetime.date, message_type: str) -> str:
+    return f"{user_id}|{target_date.isoformat()}|{message_type}"
+
+
+def parse_custom_id(custom_id: str) -> tuple:
+    user_id, target_date, message_type = custom_id.split("|")
+    return UUID(user_id), datetime.date.fromisoformat(target_date), message_type
+
+
+async def load_active_users(session) -> list:
+    result = await session.execute(
+        select(User)
+        .options(selectinload(User.goals))
+        .where(User.goals.any(Goal.is_completed.isnot(True)))
+    )
+    return list(result.scalars().all())
+
+
+def build_batch_requests(users: list, target_date: datetime.date) -> tuple:
+    """
+    one chat completion request per user per slot, built with the same templates as
+    simulate-day. returns (requests, manifest) where manifest maps custom_id to the
+    template hash + variables that get stored on the pending DailyLog
+    """
+    requests, manifest = [], {}
+    for user in users:
+        if not user.goals:
+            continue
+        prompt_values = build_prompt_values(user, user.goals[0].description)
+        for message_type in message_keys_for(user):
+            template = get_template(message_type)
+            prompt_variables = template.variables_for(prompt_values)
+            custom_id = make_custom_id(user.id, target_date, message_type)
+            requests.append({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": BATCH_ENDPOINT,
+                "body": {
+                    "model": OPENAI_MODELS[template.model_tier],
+                    "messages": [{"role": "user", "content": build_full_prompt(template.render(prompt_variables))}],
+                },
+            })
+            manifest[custom_id] = {"prompt_template_hash": template.hash, "prompt_variables": prompt_variables}
+    return requests, manifest
+
+
+def write_batch_file(requests: list, target_date: datetime.date) -> str:
+    os.makedirs(BATCH_DIR, exist_ok=True)
+    path = os.path.join(BATCH_DIR, f"pregen_{target_date.isoformat()}.jsonl")
+    with open(path, "w", encoding="utf-8") as f:
+        for request in requests:
+            f.write(json.dumps(request, ensure_ascii=False) + "\n")
+    return path
+
+
+def submit_batch(path: str) -> str:
+    if client is None:
+        raise ValueError("OPENAI_API_KEY is not set in your environment variables.")
+    with open(path, "rb") as f:
+        batch_file = client.files.create(file=f, purpose="batch")
+    batch = client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint=BATCH_ENDPOINT,
+        completion_window="24h",
+    )
+    logger.info("Submitted batch %s (%s)", batch.id, path)
+    return batch.id
+
+
+def wait_for_batch(batch_id: str, poll_interval: float = BATCH_POLL_INTERVAL, timeout: float = BATCH_TIMEOUT):
+    deadline = time.monotonic() + timeout
+    while True:
+        batch = client.batches.retrieve(batch_id)
+        if batch.status in ("completed", "failed", "expired", "cancelled"):
+            return batch
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Batch {batch_id} still {batch.status} after {timeout}s")
+        time.sleep(poll_interval)
+
+
+def download_results(batch) -> list:
+    if not batch.output_file_id:
+        return []
+    content = client.files.content(batch.output_file_id).text
+    return [json.loads(line) for line in content.splitlines() if line.strip()]
+
+
+async def ingest_results(results: list, manifest: dict, target_date: datetime.date) -> int:
+    """
+    writes each successful result as a pending DailyLog (sent_at is NULL). simulate-day
+    picks those up instead of calling the model. failed results are skipped, that slot
+    just gets generated live at send time
+    """
+    rows = []
+    for result in results:
+        custom_id = result.get("custom_id")
+        response = result.get("response") or {}
+        if result.get("error") or response.get("status_code") != 200 or custom_id not in manifest:
+            logger.warning("Skipping batch result %s: %s", custom_id, result.get('error'))
+            continue
+        user_id, log_date, message_type = parse_custom_id(custom_id)
+        rows.append(DailyLog(
+            user_id=user_id,
+            date=log_date,
+            message_type=message_type,
+            message_content=response["body"]["choices"][0]["message"]["content"],
+            is_sent=False,
+            **manifest[custom_id],
+        ))
+
+    # every user that was part of this run, including those whose results all failed,
+    # so a re-run never leaves pending rows from an earlier run behind
+    user_ids = {parse_custom_id(custom_id)[0] for custom_id in manifest}
+
+    async with AsyncSessionLocal() as session:
+        # re-running the pipeline for a date replaces its pending rows instead of duplicating them
+        await session.execute(
+            delete(DailyLog)
+            .where(DailyLog.date == target_date, DailyLog.sent_at.is_(None))
+            .where(DailyLog.user_id.in_(user_ids))
+        )
+        session.add_all(rows)
+        await session.commit()
+    return len(rows)
+
+
+async def run_pregeneration(target_date: Optional[datetime.date] = None) -> dict:
+    target_date = target_date or datetime.datetime.now(datetime.timezone.utc).date() + datetime.timedelta(days=1)
+
+    async with AsyncSessionLocal() as session:
+        users = await load_active_users(session)
+
+    requests, manifest = build_batch_requests(users, target_date)
+    if not requests:
+        return {"target_date": target_date.isoformat(), "requests": 0, "ingested": 0}
+
+    # the sdk calls and the polling (up to BATCH_TIMEOUT) block, keep them off the event loop
+    path = await asyncio.to_thread(write_batch_file, requests, target_date)
+    batch_id = await asyncio.to_thread(submit_batch, path)
+    batch = await asyncio.to_thread(wait_for_batch, batch_id)
+    if batch.status != "completed":
+        raise RuntimeError(f"Batch {batch_id} ended with status {batch.status}")
+
+    results = await asyncio.to_thread(download_results, batch)
+    ingested = await ingest_results(results, manifest, target_date)
+    return {"target_date": target_date.isoformat(), "batch_id": batch_id, "requests": len(requests), "ingested": ingested}
+
+
+if __name__ == "__main__":
+    configure_logging()
+    date_arg = datetime.date.fromisoformat(sys.argv[1]) if len(sys.argv) > 1 else None
+    print(asyncio.run(run_pregeneration(date_arg)))
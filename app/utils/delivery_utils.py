@@ -0,0 +1,72 @@
+import uuid
+import logging
+import datetime
+from typing import Optional
+
+from . import messaging_utils, email_utils
+
+logger = logging.getLogger(__name__)
+
+DIGEST_LABEL = "=== DIGEST 📬 ==="
+DIGEST_SEPARATOR = "\n\n━━━━━━━━━━\n\n"
+
+
+def group_into_deliveries(slots: list, delivery_policy: str, window_minutes: int) -> list:
+    """
+    splits the day's slots into sends. "immediate" is one send per slot, "digest"
+    coalesces every slot scheduled within window_minutes of the first one in the group.
+    each slot is a dict with at least a "scheduled_at" datetime (or None)
+    """
+    if delivery_policy != "digest":
+        return [[slot] for slot in slots]
+
+    window = datetime.timedelta(minutes=window_minutes)
+    timed = sorted((slot for slot in slots if slot["scheduled_at"]), key=lambda slot: slot["scheduled_at"])
+    groups = []
+    for slot in timed:
+        if groups and slot["scheduled_at"] - groups[-1][0]["scheduled_at"] <= window:
+            groups[-1].append(slot)
+        else:
+            groups.append([slot])
+    # slots without a schedule can't be coalesced, they go out on their own
+    groups.extend([slot] for slot in slots if not slot["scheduled_at"])
+    return groups
+
+
+def send_delivery(user, group: list) -> tuple[bool, str]:
+    """
+    sends one message per channel for the whole group and returns
+    (delivered, delivery_id). every DailyLog in the group gets the same delivery_id
+    """
+    delivery_id = uuid.uuid4().hex
+    if len(group) == 1:
+        label = group[0]["base_label"]
+        body = group[0]["content"]
+    else:
+        label = DIGEST_LABEL
+        body = DIGEST_SEPARATOR.join(slot["content"] for slot in group)
+    slot_keys = ",".join(slot["message_type"] for slot in group)
+
+    delivered = False
+
+    if user.notification_preference in ["sms", "both"] and user.phone_number:
+        try:
+            message_sid: Optional[str] = messaging_utils.send_sms(to_number=user.phone_number, body=body)
+            if message_sid:
+                delivered = True
+        except Exception as e:
+            logger.error("SMS failed for %s (user: %s): %s", slot_keys, user.id, e, exc_info=True)
+
+    if user.notification_preference in ["email", "both"] and user.email:
+        try:
+            email_utils.send_email(
+                to_email=user.email,
+                message_type=label,
+                message_body=body,
+                buddy_name=user.buddy_name
+            )
+            delivered = True
+        except Exception as e:
+            logger.error("Email failed for %s (user: %s): %s", slot_keys, user.id, e, exc_info=True)
+
+    return delivered, delivery_id
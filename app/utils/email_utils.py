@@ -2,6 +2,8 @@ import logging
 from datetime import datetime  
 from resend import Emails
 
+logger = logging.getLogger(__name__)
+
 def format_subject(message_type: str) -> str:
     today = datetime.now().strftime("%A %B %d, %Y")
     return f"{message_type} {today}"
@@ -17,13 +19,13 @@ def send_email(to_email: str, message_type: str, message_body: str, buddy_name:
             "html": f"<pre style='font-size: 16px'>{message_body}</pre>"
         })
 
-        logging.info(f"📧 Resend email response: {response}")
+        logger.debug("Resend email response: %s", response)
 
         if not response or not isinstance(response, dict) or not response.get("id"):
             raise ValueError("❌ Resend API did not return a valid response or ID.")
 
-        logging.info(f"✅ Email successfully sent to {to_email} with ID: {response['id']}")
+        logger.info("Email successfully sent to %s with ID: %s", to_email, response['id'])
 
     except Exception as e:
-        logging.error(f"❌ Email sending failed: {e}", exc_info=True)
+        logger.error("Email sending failed: %s", e, exc_info=True)
         raise
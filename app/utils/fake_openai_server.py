@@ -0,0 +1,135 @@
+"""
+tiny OpenAI-compatible stand-in for local runs and tests, stdlib only.
+supports chat completions, file upload/download and batches (completed instantly).
+
+    python -m app.utils.fake_openai_server 8089
+    OPENAI_BASE_URL=http://localhost:8089/v1 python -m app.utils.batch_utils
+"""
+import sys
+import json
+import time
+import uuid
+import hashlib
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FILES: dict = {}
+BATCHES: dict = {}
+
+
+def fake_completion(body: dict) -> dict:
+    prompt = body["messages"][-1]["content"]
+    digest = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:8]
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "fake"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": f"Stay the course today, every small step counts. [{digest}]"},
+            "finish_reason": "stop",
+        }],
+        "usage": {"prompt_tokens": len(prompt.split()), "completion_tokens": 9, "total_tokens": len(prompt.split()) + 9},
+    }
+
+
+def run_batch(batch: dict) -> None:
+    output_lines = []
+    for line in FILES[batch["input_file_id"]]["content"].decode("utf-8").splitlines():
+        if not line.strip():
+            continue
+        request = json.loads(line)
+        output_lines.append(json.dumps({
+            "id": f"batch_req_{uuid.uuid4().hex[:12]}",
+            "custom_id": request["custom_id"],
+            "response": {"status_code": 200, "request_id": uuid.uuid4().hex, "body": fake_completion(request["body"])},
+            "error": None,
+        }))
+    output_id = store_file("\n".join(output_lines).encode("utf-8"), "batch_output.jsonl", "batch_output")
+    batch.update({
+        "status": "completed",
+        "output_file_id": output_id,
+        "completed_at": int(time.time()),
+        "request_counts": {"total": len(output_lines), "completed": len(output_lines), "failed": 0},
+    })
+
+
+def store_file(content: bytes, filename: str, purpose: str) -> str:
+    file_id = f"file-{uuid.uuid4().hex[:24]}"
+    FILES[file_id] = {
+        "content": content,
+        "meta": {
+            "id": file_id, "object": "file", "bytes": len(content), "created_at": int(time.time()),
+            "filename": filename, "purpose": purpose, "status": "processed",
+        },
+    }
+    return file_id
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+
+    def send_json(self, payload: dict, status: int = 200) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def do_POST(self):
+        if self.path == "/v1/chat/completions":
+            return self.send_json(fake_completion(json.loads(self.read_body())))
+
+        if self.path == "/v1/files":
+            raw = f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode("utf-8") + self.read_body()
+            form = BytesParser(policy=HTTP).parsebytes(raw)
+            fields = {part.get_param("name", header="content-disposition"): part for part in form.iter_parts()}
+            upload = fields["file"]
+            file_id = store_file(upload.get_payload(decode=True), upload.get_filename() or "upload.jsonl", fields["purpose"].get_content().strip())
+            return self.send_json(FILES[file_id]["meta"])
+
+        if self.path == "/v1/batches":
+            request = json.loads(self.read_body())
+            batch_id = f"batch_{uuid.uuid4().hex[:24]}"
+            batch = {
+                "id": batch_id, "object": "batch", "endpoint": request["endpoint"],
+                "input_file_id": request["input_file_id"], "completion_window": request["completion_window"],
+                "status": "in_progress", "created_at": int(time.time()),
+                "output_file_id": None, "error_file_id": None,
+            }
+            BATCHES[batch_id] = batch
+            run_batch(batch)
+            return self.send_json(batch)
+
+        self.send_json({"error": {"message": f"Unknown route {self.path}"}}, status=404)
+
+    def do_GET(self):
+        parts = self.path.strip("/").split("/")
+        if parts[:2] == ["v1", "batches"] and len(parts) == 3 and parts[2] in BATCHES:
+            return self.send_json(BATCHES[parts[2]])
+
+        if parts[:2] == ["v1", "files"] and len(parts) == 4 and parts[3] == "content" and parts[2] in FILES:
+            content = FILES[parts[2]]["content"]
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+            return
+
+        self.send_json({"error": {"message": f"Unknown route {self.path}"}}, status=404)
+
+
+def serve(port: int = 8089) -> ThreadingHTTPServer:
+    return ThreadingHTTPServer(("127.0.0.1", port), FakeOpenAIHandler)
+
+
+if __name__ == "__main__":
+    server = serve(int(sys.argv[1]) if len(sys.argv) > 1 else 8089)
+    print(f"Fake OpenAI server on http://127.0.0.1:{server.server_port}/v1")
+    server.serve_forever()
@@ -0,0 +1,210 @@
+import os
+import hmac
+import base64
+import asyncio
+import hashlib
+import logging
+import datetime
+from typing import Optional
+
+from sqlalchemy import insert
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+from sqlalchemy.future import select
+
+from ..database import AsyncSessionLocal, mark_user_write
+from ..models import User, UserMessage
+from .messaging_utils import AUTH_TOKEN
+from .phone_utils import normalize_phone_number
+
+logger = logging.getLogger(__name__)
+
+INBOUND_BATCH_SIZE = int(os.getenv("INBOUND_BATCH_SIZE", "200"))
+INBOUND_FLUSH_INTERVAL = float(os.getenv("INBOUND_FLUSH_INTERVAL", "0.5"))
+INBOUND_QUEUE_MAX = int(os.getenv("INBOUND_QUEUE_MAX", "10000"))
+PHONE_CACHE_MAX = int(os.getenv("INBOUND_PHONE_CACHE_MAX", "50000"))
+# retries per batch on connection-level errors, backoff doubles from the base delay
+INBOUND_MAX_ATTEMPTS = int(os.getenv("INBOUND_MAX_ATTEMPTS", "5"))
+INBOUND_RETRY_BASE_DELAY = float(os.getenv("INBOUND_RETRY_BASE_DELAY", "0.5"))
+INBOUND_RETRY_MAX_DELAY = float(os.getenv("INBOUND_RETRY_MAX_DELAY", "10"))
+
+# twilio signs the public url, which is not what we see behind render's proxy
+TWILIO_WEBHOOK_URL = os.getenv("TWILIO_WEBHOOK_URL")
+
+EMPTY_TWIML = '<?xml version="1.0" encoding="UTF-8"?><Response></Response>'
+
+# put on the queue by stop(), run() flushes what it holds and exits when it gets it
+_STOP = object()
+
+
+def verify_twilio_signature(url: str, params: dict, signature: Optional[str]) -> bool:
+    """same scheme as twilio's RequestValidator: base64(hmac-sha1(url + sorted key/values))"""
+    if not AUTH_TOKEN or not signature:
+        return False
+    payload = url + "".join(f"{key}{params[key]}" for key in sorted(params))
+    digest = hmac.new(AUTH_TOKEN.encode("utf-8"), payload.encode("utf-8"), hashlib.sha1).digest()
+    return hmac.compare_digest(base64.b64encode(digest).decode("ascii"), signature)
+
+
+def is_transient_db_error(e: Exception) -> bool:
+    """connection drops / timeouts are worth retrying, constraint or data errors are not"""
+    if isinstance(e, (OperationalError, InterfaceError, OSError, asyncio.TimeoutError)):
+        return True
+    return isinstance(e, DBAPIError) and e.connection_invalidated
+
+
+def describe_db_error(e: Exception) -> str:
+    """error class + driver message, str(e) on a sqlalchemy error also carries the bound parameters (message bodies)"""
+    orig = getattr(e, "orig", None)
+    return f"{type(e).__name__}: {orig if orig is not None else e}"
+
+
+class InboundMessageWriter:
+    """
+    buffers inbound sms replies in memory and writes them to user_messages in
+    batches, so the webhook only has to put the message on a queue. twilio already
+    got a 200 for everything on the queue, so nothing on it may be dropped: stop()
+    drains it and transient db errors are retried with backoff
+    """
+
+    def __init__(self, batch_size: int = INBOUND_BATCH_SIZE, flush_interval: float = INBOUND_FLUSH_INTERVAL, queue_max: int = INBOUND_QUEUE_MAX):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_max)
+        self.phone_cache: dict = {}
+        self.task: Optional[asyncio.Task] = None
+        self.stopping = False
+        self.stats = {"enqueued": 0, "written": 0, "rejected_full": 0, "rejected_stopping": 0, "unknown_sender": 0, "retried": 0, "requeued": 0, "failed": 0}
+
+    def enqueue(self, phone_number: str, body: str) -> bool:
+        # once stop() was called nothing new goes in, the webhook answers 503 and twilio retries later
+        if self.stopping:
+            self.stats["rejected_stopping"] += 1
+            return False
+        # users.phone_number is E.164, twilio's From should be too but don't rely on it
+        phone_number = normalize_phone_number(phone_number) or phone_number
+        try:
+            self.queue.put_nowait((phone_number, body, datetime.datetime.now(datetime.timezone.utc)))
+        except asyncio.QueueFull:
+            self.stats["rejected_full"] += 1
+            return False
+        self.stats["enqueued"] += 1
+        return True
+
+    def start(self) -> None:
+        if self.task is None:
+            self.stopping = False
+            self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """lets run() write everything it holds and everything still queued, then returns"""
+        if self.task is None:
+            return
+        self.stopping = True
+        await self.queue.put(_STOP)
+        await self.task
+        self.task = None
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stop_seen = False
+        while not stop_seen:
+            item = await self.queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stop_seen = True
+                    break
+                batch.append(item)
+            await self.write_batch(batch, final=stop_seen)
+
+        # anything requeued after the stop marker went in
+        leftover = []
+        while not self.queue.empty():
+            item = self.queue.get_nowait()
+            if item is not _STOP:
+                leftover.append(item)
+        for start in range(0, len(leftover), self.batch_size):
+            await self.write_batch(leftover[start:start + self.batch_size], final=True)
+
+    async def write_batch(self, batch: list, final: bool = False) -> None:
+        for attempt in range(1, INBOUND_MAX_ATTEMPTS + 1):
+            try:
+                await self.flush(batch)
+                return
+            except Exception as e:
+                if not is_transient_db_error(e):
+                    self.stats["failed"] += len(batch)
+                    logger.error("Failed to write %d inbound messages: %s", len(batch), describe_db_error(e))
+                    return
+                if attempt == INBOUND_MAX_ATTEMPTS:
+                    break
+                delay = min(INBOUND_RETRY_BASE_DELAY * 2 ** (attempt - 1), INBOUND_RETRY_MAX_DELAY)
+                self.stats["retried"] += 1
+                logger.warning("Writing %d inbound messages failed (attempt %d), retrying in %.1fs: %s", len(batch), attempt, delay, describe_db_error(e))
+                await asyncio.sleep(delay)
+
+        if not final:
+            # db still down, put the batch back and keep serving the queue, the next round retries it
+            requeued = 0
+            for item in batch:
+                try:
+                    self.queue.put_nowait(item)
+                    requeued += 1
+                except asyncio.QueueFull:
+                    break
+            self.stats["requeued"] += requeued
+            batch = batch[requeued:]
+            if not batch:
+                return
+        self.stats["failed"] += len(batch)
+        # no phone numbers or bodies in the log, only enough to find the affected window
+        logger.error(
+            "Giving up on %d inbound messages received between %s and %s",
+            len(batch), min(received_at for _, _, received_at in batch), max(received_at for _, _, received_at in batch),
+        )
+
+    async def resolve_users(self, session, phone_numbers: set) -> dict:
+        missing = [phone for phone in phone_numbers if phone not in self.phone_cache]
+        if missing:
+            result = await session.execute(select(User.id, User.phone_number).where(User.phone_number.in_(missing)))
+            if len(self.phone_cache) + len(missing) > PHONE_CACHE_MAX:
+                self.phone_cache.clear()
+            for user_id, phone_number in result:
+                self.phone_cache[phone_number] = user_id
+        return {phone: self.phone_cache[phone] for phone in phone_numbers if phone in self.phone_cache}
+
+    async def flush(self, batch: list) -> None:
+        """one attempt, raises on failure. stats are only touched once the batch is committed"""
+        async with AsyncSessionLocal() as session:
+            users_by_phone = await self.resolve_users(session, {phone for phone, _, _ in batch})
+            rows = []
+            for phone_number, body, received_at in batch:
+                user_id = users_by_phone.get(phone_number)
+                if user_id is None:
+                    continue
+                rows.append({
+                    "user_id": user_id,
+                    "message_content": body,
+                    "timestamp": received_at,
+                    "sender_type": "user",
+                })
+            if rows:
+                await session.execute(insert(UserMessage), rows)
+                await session.commit()
+                for user_id in {row["user_id"] for row in rows}:
+                    mark_user_write(user_id)
+        self.stats["written"] += len(rows)
+        self.stats["unknown_sender"] += len(batch) - len(rows)
+
+
+inbound_writer = InboundMessageWriter()
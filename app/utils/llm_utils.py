@@ -0,0 +1,207 @@
+import os
+import time
+import random
+import hashlib
+import logging
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Optional
+from dotenv import load_dotenv
+from openai import OpenAI
+
+logger = logging.getLogger(__name__)
+
+try:
+    import google.generativeai as genai
+except ImportError:
+    genai = None
+
+load_dotenv()
+
+# comma separated, in order of preference before the router has seen any traffic
+LLM_BACKENDS = [name.strip() for name in os.getenv("LLM_BACKENDS", "openai").split(",") if name.strip()]
+
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+
+# "small" serves the 30-40 word texts, "large" is kept for anything that needs more reasoning
+OPENAI_MODELS = {"small": "gpt-4o-mini", "large": "gpt-4o"}
+GEMINI_MODELS = {"small": "gemini-1.5-flash", "large": "gemini-1.5-pro"}
+
+# rough blended $ per 1M tokens, only used to break ties between similar latencies
+OPENAI_COSTS = {"small": 0.6, "large": 10.0}
+GEMINI_COSTS = {"small": 0.3, "large": 5.0}
+
+# per call, kept short and without sdk retries: the router fails over to the next backend instead
+LLM_REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", "20"))
+
+ROUTER_WINDOW_SIZE = int(os.getenv("LLM_ROUTER_WINDOW_SIZE", "50"))
+ROUTER_WINDOW_SECONDS = float(os.getenv("LLM_ROUTER_WINDOW_SECONDS", "300"))
+# score = avg latency (s) + error_rate * ERROR_PENALTY + cost * COST_WEIGHT, lowest wins
+ROUTER_ERROR_PENALTY = float(os.getenv("LLM_ROUTER_ERROR_PENALTY", "10"))
+ROUTER_COST_WEIGHT = float(os.getenv("LLM_ROUTER_COST_WEIGHT", "0.05"))
+# latency assumed for a backend with no recent observations. optimistic on purpose,
+# so every backend gets measured and a recovered one gets retried once its window expires
+ROUTER_PRIOR_LATENCY = float(os.getenv("LLM_ROUTER_PRIOR_LATENCY", "0"))
+# share of calls that try a random backend first, keeps latency numbers fresh for all of them
+ROUTER_EXPLORE_RATE = float(os.getenv("LLM_ROUTER_EXPLORE_RATE", "0.05"))
+
+
+class LLMBackend(ABC):
+    name = "base"
+    models: dict = {}
+    costs: dict = {}
+
+    @abstractmethod
+    def complete(self, prompt: str, tier: str) -> str:
+        """returns the completion text, raises on any failure so the router can fail over"""
+
+    def cost(self, tier: str) -> float:
+        return self.costs.get(tier, 0.0)
+
+
+class OpenAIBackend(LLMBackend):
+    name = "openai"
+    models = OPENAI_MODELS
+    costs = OPENAI_COSTS
+
+    def __init__(self, client: OpenAI):
+        self.client = client
+
+    def complete(self, prompt: str, tier: str) -> str:
+        response = self.client.chat.completions.create(
+            model=self.models[tier],
+            messages=[{"role": "user", "content": prompt}],
+            stream=False
+        )
+        return response.choices[0].message.content
+
+
+class GeminiBackend(LLMBackend):
+    name = "gemini"
+    models = GEMINI_MODELS
+    costs = GEMINI_COSTS
+
+    def __init__(self, api_key: str):
+        genai.configure(api_key=api_key)
+        self.clients = {tier: genai.GenerativeModel(model) for tier, model in self.models.items()}
+
+    def complete(self, prompt: str, tier: str) -> str:
+        return self.clients[tier].generate_content(prompt, request_options={"timeout": LLM_REQUEST_TIMEOUT}).text
+
+
+class FakeBackend(LLMBackend):
+    """offline backend with configurable latency / failure rate, for tests and local runs"""
+
+    def __init__(self, name: str = "fake", latency: float = 0.0, failure_rate: float = 0.0, cost: float = 0.0):
+        self.name = name
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.costs = {"small": cost, "large": cost}
+        self.models = {"small": f"{name}-small", "large": f"{name}-large"}
+
+    def complete(self, prompt: str, tier: str) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise RuntimeError(f"{self.name} simulated failure")
+        digest = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:8]
+        return f"Keep showing up today, one focused step at a time. [{self.name}:{tier}:{digest}]"
+
+
+class LLMRouter:
+    """
+    picks the backend with the best recent latency / error rate / cost and
+    fails over to the next one when a call raises
+    """
+
+    def __init__(self, backends: list):
+        if not backends:
+            raise ValueError("LLMRouter needs at least one backend.")
+        self.backends = backends
+        self.observations = {backend.name: deque(maxlen=ROUTER_WINDOW_SIZE) for backend in backends}
+        self.lock = threading.Lock()
+
+    def record(self, backend: LLMBackend, latency: float, ok: bool) -> None:
+        with self.lock:
+            self.observations[backend.name].append((time.monotonic(), latency, ok))
+
+    def window(self, backend: LLMBackend) -> list:
+        cutoff = time.monotonic() - ROUTER_WINDOW_SECONDS
+        with self.lock:
+            return [obs for obs in self.observations[backend.name] if obs[0] >= cutoff]
+
+    def score(self, backend: LLMBackend, tier: str) -> float:
+        recent = self.window(backend)
+        successes = [latency for _, latency, ok in recent if ok]
+        latency = sum(successes) / len(successes) if successes else ROUTER_PRIOR_LATENCY
+        error_rate = sum(1 for _, _, ok in recent if not ok) / len(recent) if recent else 0.0
+        return latency + error_rate * ROUTER_ERROR_PENALTY + backend.cost(tier) * ROUTER_COST_WEIGHT
+
+    def ranked(self, tier: str) -> list:
+        # sorted() is stable so LLM_BACKENDS order breaks exact ties
+        ranked = sorted(self.backends, key=lambda backend: self.score(backend, tier))
+        if len(ranked) > 1 and random.random() < ROUTER_EXPLORE_RATE:
+            explore = random.choice(ranked[1:])
+            ranked.remove(explore)
+            ranked.insert(0, explore)
+        return ranked
+
+    def complete(self, prompt: str, tier: str = "large") -> tuple:
+        """returns (text, backend name), raises only when every backend failed"""
+        errors = []
+        for backend in self.ranked(tier):
+            started = time.perf_counter()
+            try:
+                text = backend.complete(prompt, tier)
+            except Exception as e:
+                self.record(backend, time.perf_counter() - started, False)
+                logger.warning("LLM backend %s failed, failing over: %s", backend.name, e)
+                errors.append(f"{backend.name}: {e}")
+                continue
+            self.record(backend, time.perf_counter() - started, True)
+            return text, backend.name
+        raise RuntimeError(f"All LLM backends failed ({'; '.join(errors)})")
+
+    def snapshot(self) -> dict:
+        stats = {}
+        for backend in self.backends:
+            recent = self.window(backend)
+            successes = [latency for _, latency, ok in recent if ok]
+            stats[backend.name] = {
+                "calls": len(recent),
+                "error_rate": round(sum(1 for _, _, ok in recent if not ok) / len(recent), 4) if recent else None,
+                "avg_latency": round(sum(successes) / len(successes), 4) if successes else None,
+                "score_small": round(self.score(backend, "small"), 4),
+                "score_large": round(self.score(backend, "large"), 4),
+            }
+        return stats
+
+
+# sdk defaults (long timeout, retries) are fine for the batch pipeline's file / batch calls
+openai_client: Optional[OpenAI] = OpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
+
+
+def build_backends(names: list) -> list:
+    backends = []
+    for name in names:
+        if name == "openai":
+            if not openai_client:
+                raise ValueError("OPENAI_API_KEY is not set in your environment variables.")
+            backends.append(OpenAIBackend(openai_client.with_options(timeout=LLM_REQUEST_TIMEOUT, max_retries=0)))
+        elif name == "gemini":
+            if genai is None or not GEMINI_API_KEY:
+                raise ValueError("Gemini backend needs google-generativeai installed and GEMINI_API_KEY set.")
+            backends.append(GeminiBackend(GEMINI_API_KEY))
+        elif name == "fake":
+            backends.append(FakeBackend(
+                latency=float(os.getenv("FAKE_LLM_LATENCY", "0")),
+                failure_rate=float(os.getenv("FAKE_LLM_FAILURE_RATE", "0")),
+            ))
+        else:
+            raise ValueError(f"Unknown LLM backend: {name}")
+    return backends
+
+
+router = LLMRouter(build_backends(LLM_BACKENDS))
@@ -1,7 +1,10 @@
 import os
+import logging
 from typing import Optional
 from dotenv import load_dotenv
 
+logger = logging.getLogger(__name__)
+
 load_dotenv()
 
 try:
@@ -25,14 +28,14 @@ def send_sms_twilio(to_number: str, body: str) -> Optional[str]:
             from_=TWILIO_PHONE_NUMBER,
             to=to_number,
         )
-        print(f"✅ [Twilio] Sent to {to_number} | SID: {message.sid}")
+        logger.info("[Twilio] Sent to %s | SID: %s", to_number, message.sid)
         return message.sid
     except Exception as e:
-        print(f"❌ [Twilio Error] Failed to send to {to_number}: {e}")
+        logger.error("[Twilio Error] Failed to send to %s: %s", to_number, e)
         return None
 
 def send_sms_local(to_number: str, body: str) -> str:
-    print(f"\n📱 [SIMULATED SMS to {to_number}]\n{body}\n")
+    logger.info("[SIMULATED SMS to %s]\n%s", to_number, body)
     return "SIMULATED_SID"
 
 def send_sms(to_number: str, body: str) -> Optional[str]:
@@ -0,0 +1,27 @@
+import os
+import re
+from typing import Optional
+
+# the signup form only takes 10-digit us numbers without a country code
+DEFAULT_COUNTRY_CODE = os.getenv("SMS_DEFAULT_COUNTRY_CODE", "1")
+
+_NON_DIGITS_RE = re.compile(r"\D")
+
+
+def normalize_phone_number(raw: Optional[str]) -> Optional[str]:
+    """
+    E.164 (+15551234567), the format twilio uses for From / To. bare national numbers
+    get DEFAULT_COUNTRY_CODE. returns None when the input can't be a phone number
+    """
+    if not raw or not raw.strip():
+        return None
+    digits = _NON_DIGITS_RE.sub("", raw)
+    if raw.strip().startswith("+"):
+        pass
+    elif len(digits) == 10:
+        digits = DEFAULT_COUNTRY_CODE + digits
+    elif not (len(digits) == 11 and digits.startswith(DEFAULT_COUNTRY_CODE)):
+        return None
+    if not 8 <= len(digits) <= 15:
+        return None
+    return f"+{digits}"
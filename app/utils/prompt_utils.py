@@ -0,0 +1,161 @@
+import hashlib
+import string
+from dataclasses import dataclass, field
+from typing import Optional
+
+from .schedule_utils import format_time_label
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """
+    a versioned prompt template. the hash is derived from key + version + text,
+    so a DailyLog row only needs the hash and the variables to rebuild its prompt
+    """
+    key: str
+    version: int
+    text: str
+    base_label: str
+    emoji: str
+    add_days_remaining: bool
+    send_time_key: str
+    similarity_cache: bool = True # set False to always generate this slot fresh
+    model_tier: str = "small" # "small" / "large", see llm_utils
+    fields: tuple = field(init=False)
+    hash: str = field(init=False)
+
+    def __post_init__(self):
+        fields = tuple(dict.fromkeys(
+            name for _, name, _, _ in string.Formatter().parse(self.text) if name
+        ))
+        digest = hashlib.sha256(f"{self.key}:{self.version}:{self.text}".encode("utf-8")).hexdigest()[:16]
+        object.__setattr__(self, "fields", fields)
+        object.__setattr__(self, "hash", digest)
+
+    def variables_for(self, values: dict) -> dict:
+        # only keep what this template actually uses, that's all we persist
+        return {name: values[name] for name in self.fields}
+
+    def render(self, variables: dict) -> str:
+        return self.text.format_map(variables)
+
+
+# every version ever shipped stays in here so old log rows can still be rebuilt.
+# to change a prompt, add a new entry with a bumped version instead of editing one.
+_TEMPLATES = [
+    PromptTemplate(
+        key="daily_system_initiation",
+        version=1,
+        text=(
+            "Write a short motivational morning message for '{full_name}'. "
+            "Use the tone of '{tone}'. Their current goal is: '{goal_text}'. "
+            "Focus: Begin daily flow, set a positive tone. Keep it concise (30-40 words). "
+            "Avoid repeating their name in the body of the message."
+        ),
+        base_label="=== RISE N SHINE 🌄 ===", emoji="📜🤝",
+        add_days_remaining=False, send_time_key="morning",
+    ),
+    PromptTemplate(
+        key="core_output_trigger",
+        version=1,
+        text=(
+            "For '{full_name}', after this habit/time: '{trigger}', "
+            "remind them why they started working toward: '{goal_text}'. "
+            "Use the tone '{tone}' and make it action-oriented. "
+            "Do not mention their name in the message body. Keep it 30-40 words."
+        ),
+        base_label="=== TRIGGER 🔔 ===", emoji="🔔",
+        add_days_remaining=True, send_time_key="trigger",
+    ),
+    PromptTemplate(
+        key="midday_push",
+        version=1,
+        text=(
+            "Write a calming and energizing midday message for '{full_name}'. "
+            "The user’s mantra is: '{mantra}'. "
+            "Use the tone '{tone}'. Focus on presence, purpose, and choosing to make today count. "
+            "Remind them life is a gift and they can still shape it. "
+            "Keep it between 30 to 40 words and avoid repeating their name."
+        ),
+        base_label="=== MIDDAY PUSH ⚡️ ===", emoji="⚡️",
+        add_days_remaining=False, send_time_key="midday",
+    ),
+    PromptTemplate(
+        key="daily_system_shutdown",
+        version=1,
+        text=(
+            "Write a reflective evening message for '{full_name}' in the tone of '{tone}'. "
+            "Prompt them to rate their day 1–10 and share one win related to their goal: '{goal_text}'. "
+            "Encourage jotting notes for clearing their mind and preparing for rest. "
+            "Do not include their name in the message. Keep it between 30-40 words."
+        ),
+        base_label="=== WINDDOWN 🌚 ===", emoji="🌙",
+        add_days_remaining=False, send_time_key="wind_down",
+    ),
+    PromptTemplate(
+        key="weekly_system_optimization",
+        version=1,
+        text=(
+            "Generate a concise 'Monday Hour 1' prompt for '{full_name}'. "
+            "Tone: '{tone}'. Goal: '{goal_text}'. "
+            "Focus: Review last week's system outputs and blueprint. Identify areas for optimization. "
+            "Encourage a focused planning session for the week ahead. Max 40 words."
+        ),
+        base_label="🗓️ Monday Hour 1", emoji="📝",
+        add_days_remaining=False, send_time_key="weekly_override",
+        model_tier="large",
+    ),
+]
+
+TEMPLATES_BY_HASH = {template.hash: template for template in _TEMPLATES}
+
+ACTIVE_TEMPLATES = {}
+for _template in sorted(_TEMPLATES, key=lambda t: t.version):
+    ACTIVE_TEMPLATES[_template.key] = _template
+
+
+DAILY_MESSAGE_KEYS = [
+    "daily_system_initiation",
+    "core_output_trigger",
+    "midday_push",
+    "daily_system_shutdown"
+]
+
+
+def get_template(key: str) -> PromptTemplate:
+    return ACTIVE_TEMPLATES[key]
+
+
+def message_keys_for(user) -> list:
+    message_keys = list(DAILY_MESSAGE_KEYS)
+    if user.monday_hour_1_enabled:
+        message_keys.append("weekly_system_optimization")
+    return message_keys
+
+
+def build_prompt_values(user, goal_text: str) -> dict:
+    """every value a template can reference, each template keeps only the ones it uses"""
+    return {
+        "full_name": user.full_name,
+        "tone": user.tone,
+        "goal_text": goal_text,
+        "trigger": user.trigger_habit or format_time_label(user.trigger_time),
+        "mantra": user.mantra or 'no mantra set',
+    }
+
+
+def render_prompt(template_hash: str, variables: dict) -> str:
+    template = TEMPLATES_BY_HASH.get(template_hash)
+    if template is None:
+        raise KeyError(f"Unknown prompt template hash: {template_hash}")
+    return template.render(variables)
+
+
+def reconstruct_prompt(log) -> Optional[str]:
+    """
+    rebuilds the prompt a DailyLog was generated from. older rows still carry
+    the full text in ai_prompt_used, newer ones only the hash + variables
+    """
+    if log.prompt_template_hash:
+        return render_prompt(log.prompt_template_hash, log.prompt_variables or {})
+    return log.ai_prompt_used
@@ -0,0 +1,11 @@
+from fastapi.responses import Response
+from pydantic import TypeAdapter
+
+
+def orm_json_response(adapter: TypeAdapter, obj, status_code: int = 200) -> Response:
+    """
+    validates ORM objects with from_attributes and dumps them to JSON bytes in one pass
+    through pydantic-core, skipping fastapi's response_model + jsonable_encoder round trip
+    """
+    content = adapter.dump_json(adapter.validate_python(obj, from_attributes=True))
+    return Response(content=content, media_type="application/json", status_code=status_code)
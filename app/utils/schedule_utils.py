@@ -0,0 +1,37 @@
+import datetime
+
+
+def format_time_label(time_obj: datetime.time) -> str:
+    
+    if isinstance(time_obj, datetime.datetime):
+        time_obj = time_obj.time()
+    return time_obj.strftime('%I:%M %p').lstrip("0")
+
+def get_scheduled_times(start_time: datetime.time, end_time: datetime.time, trigger_time: datetime.time) -> dict:
+    today = datetime.date.today()
+    base = datetime.datetime.combine(today, start_time)
+    end = datetime.datetime.combine(today, end_time)
+    trigger = datetime.datetime.combine(today, trigger_time)
+    wind_down_time = end - datetime.timedelta(hours=1.5) 
+
+    
+    
+    start_minutes = start_time.hour * 60 + start_time.minute
+    end_minutes = end_time.hour * 60 + end_time.minute
+
+    
+    if end_minutes < start_minutes:
+        end_minutes += 24 * 60 
+
+    midpoint_minutes = start_minutes + (end_minutes - start_minutes) / 2
+    midday_hour = int(midpoint_minutes // 60) % 24 
+    midday_minute = int(midpoint_minutes % 60)
+
+    midday_push_time_obj = datetime.time(midday_hour, midday_minute)
+
+    return {
+        "morning": base,
+        "trigger": trigger,
+        "midday": datetime.datetime.combine(today, midday_push_time_obj),
+        "wind_down": wind_down_time
+    }
@@ -0,0 +1,123 @@
+import os
+import sys
+import gzip
+import hashlib
+import logging
+import mimetypes
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+FRONTEND_DIR = os.getenv("FRONTEND_DIR", os.path.join(os.path.dirname(__file__), "..", "..", "frontend"))
+FRONTEND_INDEX = os.path.join(FRONTEND_DIR, "index.html")
+
+# the bare url is revalidated every time (cheap 304), the hashed url never changes so it can be cached forever
+REVALIDATE_CACHE_CONTROL = "no-cache"
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# preferred order when the client accepts more than one
+ENCODINGS = ("br", "gzip")
+
+
+@dataclass(frozen=True)
+class StaticAsset:
+    name: str
+    media_type: str
+    content_hash: str
+    variants: dict  # content-encoding ("identity", "gzip", "br") -> body
+
+    @property
+    def hashed_name(self) -> str:
+        stem, ext = os.path.splitext(self.name)
+        return f"{stem}.{self.content_hash}{ext}"
+
+    def etag(self, encoding: str) -> str:
+        # strong etags have to differ per encoding since the bytes differ
+        return f'"{self.content_hash}"' if encoding == "identity" else f'"{self.content_hash}-{encoding}"'
+
+
+def compress_variants(content: bytes) -> dict:
+    """
+    compressed once at startup at max level, a variant is only kept if it is smaller.
+    gzip mtime is pinned so the bytes (and etag) are stable across restarts
+    """
+    variants = {"identity": content}
+    gzipped = gzip.compress(content, compresslevel=9, mtime=0)
+    if len(gzipped) < len(content):
+        variants["gzip"] = gzipped
+    if brotli is not None:
+        compressed = brotli.compress(content, mode=brotli.MODE_TEXT, quality=11)
+        if len(compressed) < len(content):
+            variants["br"] = compressed
+    return variants
+
+
+def load_asset(path: str) -> Optional[StaticAsset]:
+    if not os.path.isfile(path):
+        logger.warning("Static asset %s not found, it won't be served.", path)
+        return None
+    with open(path, "rb") as f:
+        content = f.read()
+    media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    if media_type.startswith("text/"):
+        media_type += "; charset=utf-8"
+    return StaticAsset(
+        name=os.path.basename(path),
+        media_type=media_type,
+        content_hash=hashlib.sha256(content).hexdigest()[:16],
+        variants=compress_variants(content),
+    )
+
+
+def negotiate_encoding(accept_encoding: str, available) -> str:
+    accepted = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    for encoding in ENCODINGS:
+        if encoding in available and accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return "identity"
+
+
+def etag_matches(if_none_match: str, asset: StaticAsset) -> bool:
+    """If-None-Match uses weak comparison, any encoding of the same content counts"""
+    if if_none_match.strip() == "*":
+        return True
+    known = {asset.etag(encoding) for encoding in asset.variants}
+    return any(tag.strip().removeprefix("W/") in known for tag in if_none_match.split(","))
+
+
+def asset_response(request: Request, asset: StaticAsset, cache_control: str) -> Response:
+    encoding = negotiate_encoding(request.headers.get("accept-encoding", ""), asset.variants)
+    headers = {
+        "Cache-Control": cache_control,
+        "ETag": asset.etag(encoding),
+        "Vary": "Accept-Encoding",
+    }
+    if etag_matches(request.headers.get("if-none-match", ""), asset):
+        return Response(status_code=304, headers=headers)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=asset.variants[encoding], media_type=asset.media_type, headers=headers)
+
+
+if __name__ == "__main__":
+    asset = load_asset(sys.argv[1] if len(sys.argv) > 1 else FRONTEND_INDEX)
+    if asset:
+        print(asset.hashed_name, {encoding: len(body) for encoding, body in asset.variants.items()})
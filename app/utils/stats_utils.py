@@ -0,0 +1,75 @@
+import datetime
+from uuid import UUID
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from ..models import UserDailyStat, Goal
+
+
+async def record_log_stats(db: AsyncSession, user_id: UUID, day: datetime.date, generated: int = 0, sent: int = 0, failed: int = 0) -> None:
+    """
+    bumps the counters for one user/day with a single upsert. call it in the
+    same transaction that writes the DailyLog rows so the two never drift apart
+    """
+    stmt = pg_insert(UserDailyStat).values(
+        user_id=user_id,
+        date=day,
+        messages_generated=generated,
+        messages_sent=sent,
+        messages_failed=failed,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UserDailyStat.user_id, UserDailyStat.date],
+        set_={
+            "messages_generated": UserDailyStat.messages_generated + stmt.excluded.messages_generated,
+            "messages_sent": UserDailyStat.messages_sent + stmt.excluded.messages_sent,
+            "messages_failed": UserDailyStat.messages_failed + stmt.excluded.messages_failed,
+            "updated_at": func.now(),
+        },
+    )
+    await db.execute(stmt)
+
+
+async def get_daily_stats(db: AsyncSession, user_id: UUID, start_date: datetime.date, end_date: datetime.date) -> list:
+    result = await db.execute(
+        select(UserDailyStat)
+        .where(UserDailyStat.user_id == user_id, UserDailyStat.date >= start_date, UserDailyStat.date <= end_date)
+        .order_by(UserDailyStat.date)
+    )
+    return list(result.scalars().all())
+
+
+def current_streak(daily_stats: list, today: datetime.date) -> int:
+    """consecutive days with at least one delivered message, ending today (or yesterday if today is still empty)"""
+    active_days = {stat.date for stat in daily_stats if stat.messages_sent > 0}
+    day = today if today in active_days else today - datetime.timedelta(days=1)
+    streak = 0
+    while day in active_days:
+        streak += 1
+        day -= datetime.timedelta(days=1)
+    return streak
+
+
+async def refresh_goal_progress(db: AsyncSession, goal: Goal, today: datetime.date) -> str:
+    """fills Goal.progress from the aggregate table, e.g. '12/30 days' or '12 days active'"""
+    start_date = goal.created_at.date() if goal.created_at else today
+    result = await db.execute(
+        select(func.count())
+        .select_from(UserDailyStat)
+        .where(
+            UserDailyStat.user_id == goal.user_id,
+            UserDailyStat.date >= start_date,
+            UserDailyStat.messages_sent > 0,
+        )
+    )
+    active_days = result.scalar_one()
+
+    if goal.target_date:
+        total_days = max((goal.target_date - start_date).days + 1, 1)
+        goal.progress = f"{active_days}/{total_days} days"
+    else:
+        goal.progress = f"{active_days} days active"
+    return goal.progress
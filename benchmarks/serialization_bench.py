@@ -0,0 +1,67 @@
+"""
+encode time per /users/{id} response: old hand-built UserResponse + fastapi's
+jsonable_encoder path vs the precompiled TypeAdapter straight to JSON bytes.
+
+    python -m benchmarks.serialization_bench
+"""
+import json
+import uuid
+import timeit
+import datetime
+from types import SimpleNamespace
+
+from fastapi.encoders import jsonable_encoder
+
+from app.schemas import UserResponse, GoalResponse, user_response_adapter
+
+N = 20000
+
+
+def make_user():
+    now = datetime.datetime.now(datetime.timezone.utc)
+    user_id = uuid.uuid4()
+    goal = SimpleNamespace(
+        id=1, user_id=user_id, description="Run a marathon", created_at=now.replace(tzinfo=None),
+        target_date=datetime.date(2026, 12, 31), is_completed=False, progress="12/90 days",
+    )
+    return SimpleNamespace(
+        id=user_id, full_name="Jamie Doe", email="jamie@example.com", phone_number="+15555550123",
+        timezone="America/Los_Angeles", notification_preference="both",
+        delivery_policy="immediate", digest_window_minutes=60,
+        daily_start_time=datetime.time(7, 0), daily_end_time=datetime.time(22, 0),
+        trigger_type="habit", trigger_time=None, trigger_habit="after morning coffee",
+        tone="Kobe Bryant", buddy_name="Bizzy", mantra="Mamba mentality",
+        is_hackathon_demo=False, monday_hour_1_enabled=True, monday_hour_1_day_of_week="Monday",
+        monday_hour_1_time=datetime.time(9, 0), created_at=now, updated_at=now,
+        goals=[goal], goal=goal,
+    )
+
+
+def manual_mapping(user) -> bytes:
+    # what get_user used to do, followed by fastapi's default response path
+    response = UserResponse(
+        id=user.id, full_name=user.full_name, email=user.email, phone_number=user.phone_number,
+        timezone=user.timezone, notification_preference=user.notification_preference,
+        delivery_policy=user.delivery_policy, digest_window_minutes=user.digest_window_minutes,
+        daily_start_time=user.daily_start_time, daily_end_time=user.daily_end_time,
+        trigger_type=user.trigger_type, trigger_time=user.trigger_time, trigger_habit=user.trigger_habit,
+        tone=user.tone, buddy_name=user.buddy_name, mantra=user.mantra,
+        is_hackathon_demo=user.is_hackathon_demo, monday_hour_1_enabled=user.monday_hour_1_enabled,
+        monday_hour_1_day_of_week=user.monday_hour_1_day_of_week, monday_hour_1_time=user.monday_hour_1_time,
+        created_at=user.created_at, updated_at=user.updated_at,
+        goal=GoalResponse.model_validate(user.goals[0]),
+    )
+    validated = UserResponse.model_validate(response.model_dump())
+    return json.dumps(jsonable_encoder(validated), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def type_adapter(user) -> bytes:
+    return user_response_adapter.dump_json(user_response_adapter.validate_python(user, from_attributes=True))
+
+
+if __name__ == "__main__":
+    user = make_user()
+    assert json.loads(manual_mapping(user)) == json.loads(type_adapter(user))
+    for name, fn in (("manual + jsonable_encoder", manual_mapping), ("TypeAdapter.dump_json", type_adapter)):
+        seconds = min(timeit.repeat(lambda: fn(user), number=N, repeat=3))
+        print(f"{name:<28} {seconds / N * 1e6:8.2f} us/response")
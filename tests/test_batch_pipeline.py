@@ -0,0 +1,68 @@
+import uuid
+import datetime
+import threading
+from types import SimpleNamespace
+
+import pytest
+from openai import OpenAI
+
+from app.utils import batch_utils
+from app.utils.fake_openai_server import serve
+from app.utils.prompt_utils import get_template, DAILY_MESSAGE_KEYS
+
+
+@pytest.fixture
+def fake_openai(monkeypatch, tmp_path):
+    server = serve(0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv("OPENAI_BASE_URL", f"http://127.0.0.1:{server.server_port}/v1")
+    # the sdk reads OPENAI_BASE_URL when the client is built
+    monkeypatch.setattr(batch_utils, "client", OpenAI(api_key="test"))
+    monkeypatch.setattr(batch_utils, "BATCH_DIR", str(tmp_path))
+    yield
+    server.shutdown()
+    server.server_close()
+
+
+def make_user(goal: str, monday_hour_1_enabled: bool = False) -> SimpleNamespace:
+    return SimpleNamespace(
+        id=uuid.uuid4(),
+        full_name="Ada Lovelace",
+        tone="Kobe Bryant",
+        trigger_habit="after coffee",
+        trigger_time=None,
+        mantra=None,
+        monday_hour_1_enabled=monday_hour_1_enabled,
+        goals=[SimpleNamespace(description=goal)],
+    )
+
+
+def test_pregeneration_round_trip(fake_openai):
+    target_date = datetime.date(2026, 10, 19)
+    users = [make_user("Run a marathon"), make_user("Learn Spanish", monday_hour_1_enabled=True), make_user("no goal")]
+    users[2].goals = []
+
+    requests, manifest = batch_utils.build_batch_requests(users, target_date)
+    assert len(requests) == len(DAILY_MESSAGE_KEYS) * 2 + 1
+    assert set(manifest) == {request["custom_id"] for request in requests}
+
+    marathon_morning = manifest[batch_utils.make_custom_id(users[0].id, target_date, "daily_system_initiation")]
+    template = get_template("daily_system_initiation")
+    assert marathon_morning["prompt_template_hash"] == template.hash
+    assert marathon_morning["prompt_variables"] == {"full_name": "Ada Lovelace", "tone": "Kobe Bryant", "goal_text": "Run a marathon"}
+
+    path = batch_utils.write_batch_file(requests, target_date)
+    batch_id = batch_utils.submit_batch(path)
+    batch = batch_utils.wait_for_batch(batch_id, poll_interval=0.01, timeout=5)
+    assert batch.status == "completed"
+
+    results = batch_utils.download_results(batch)
+    assert {result["custom_id"] for result in results} == set(manifest)
+    for result in results:
+        assert result["error"] is None
+        assert result["response"]["status_code"] == 200
+        assert result["response"]["body"]["choices"][0]["message"]["content"]
+        user_id, log_date, message_type = batch_utils.parse_custom_id(result["custom_id"])
+        assert log_date == target_date
+        assert user_id in {users[0].id, users[1].id}
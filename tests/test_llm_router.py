@@ -0,0 +1,60 @@
+import pytest
+
+from app.utils import llm_utils
+from app.utils.llm_utils import LLMRouter, FakeBackend
+
+
+@pytest.fixture(autouse=True)
+def no_exploration(monkeypatch):
+    monkeypatch.setattr(llm_utils, "ROUTER_EXPLORE_RATE", 0.0)
+
+
+def test_fails_over_to_next_backend():
+    router = LLMRouter([FakeBackend("down", failure_rate=1.0), FakeBackend("up")])
+
+    text, backend_name = router.complete("hello", "small")
+
+    assert backend_name == "up"
+    assert "[up:small:" in text
+    assert router.snapshot()["down"]["error_rate"] == 1.0
+    # the failure is scored, the healthy backend goes first from now on
+    assert router.ranked("small")[0].name == "up"
+
+
+def test_raises_when_every_backend_fails():
+    router = LLMRouter([FakeBackend("a", failure_rate=1.0), FakeBackend("b", failure_rate=1.0)])
+
+    with pytest.raises(RuntimeError, match="All LLM backends failed"):
+        router.complete("hello", "small")
+
+
+def test_prefers_lower_latency():
+    slow, fast = FakeBackend("slow", latency=0.05), FakeBackend("fast")
+    router = LLMRouter([slow, fast])
+
+    used = [router.complete(f"prompt {i}", "small")[1] for i in range(5)]
+
+    # both start unobserved, the first call measures slow, the rest stick to fast
+    assert used[0] == "slow"
+    assert used[1:] == ["fast"] * 4
+    assert router.score(fast, "small") < router.score(slow, "small")
+
+
+def test_cost_breaks_latency_ties():
+    router = LLMRouter([FakeBackend("pricey", cost=10.0), FakeBackend("cheap", cost=0.5)])
+
+    assert [backend.name for backend in router.ranked("large")] == ["cheap", "pricey"]
+
+
+@pytest.mark.parametrize("tier", ["small", "large"])
+def test_tier_is_passed_to_backend(tier):
+    router = LLMRouter([FakeBackend("fake")])
+
+    text, _ = router.complete("hello", tier)
+
+    assert f"[fake:{tier}:" in text
+
+
+def test_needs_a_backend():
+    with pytest.raises(ValueError):
+        LLMRouter([])
@@ -0,0 +1,14 @@
+import pytest
+
+from app.utils.phone_utils import normalize_phone_number
+
+
+@pytest.mark.parametrize("raw", ["5551234567", "(555) 123-4567", "15551234567", "+1 555 123 4567", "+15551234567"])
+def test_signup_and_twilio_formats_match(raw):
+    # signup sends 10 bare digits, twilio's From is E.164, both have to land on the same value
+    assert normalize_phone_number(raw) == "+15551234567"
+
+
+@pytest.mark.parametrize("raw", [None, "", "   ", "123", "+1"])
+def test_invalid_numbers(raw):
+    assert normalize_phone_number(raw) is None
@@ -0,0 +1,95 @@
+import pytest
+
+from app.utils import ai_utils
+from app.utils.ai_utils import MinHashLSHCache, similarity_key, depersonalize, personalize
+from app.utils.prompt_utils import get_template
+
+
+def variables(template_key: str, goal_text: str, tone: str = "Kobe Bryant", full_name: str = "Ada Lovelace") -> dict:
+    values = {"full_name": full_name, "tone": tone, "goal_text": goal_text, "trigger": "after coffee", "mantra": "no mantra set"}
+    return get_template(template_key).variables_for(values)
+
+
+@pytest.fixture
+def cache():
+    return MinHashLSHCache(threshold=0.8)
+
+
+@pytest.mark.parametrize("template_key", ["daily_system_initiation", "daily_system_shutdown"])
+def test_different_goals_miss(cache, template_key):
+    template = get_template(template_key)
+    stored = variables(template_key, "Run a marathon")
+    cache.store(*similarity_key(template.hash, stored), "Every mile of Run a marathon starts now.")
+
+    assert cache.lookup(*similarity_key(template.hash, variables(template_key, "Learn Spanish"))) is None
+
+
+def test_near_identical_goal_hits_and_is_personalized(cache):
+    template = get_template("daily_system_initiation")
+    stored = variables("daily_system_initiation", "Run a marathon")
+    cache.store(*similarity_key(template.hash, stored), depersonalize("Ada Lovelace, one more step toward Run a marathon today.", stored))
+
+    current = variables("daily_system_initiation", "run a marathon", full_name="Grace Hopper")
+    cached = cache.lookup(*similarity_key(template.hash, current))
+    assert cached is not None
+    assert personalize(cached, current) == "Grace Hopper, one more step toward run a marathon today."
+
+
+def test_common_word_name_is_not_cached():
+    stored = variables("daily_system_initiation", "Read more", full_name="Will")
+    assert depersonalize("You will read more today, and you will love it.", stored) is None
+    assert depersonalize("Will, you will get there.", stored) is None
+
+
+def test_goal_in_other_casing_is_not_cached():
+    stored = variables("daily_system_initiation", "Read more books")
+    assert depersonalize("Today, read more books than yesterday.", stored) is None
+
+
+def test_values_absent_from_response_are_fine():
+    stored = variables("daily_system_initiation", "Read more", full_name="Will")
+    assert depersonalize("Open a book before your phone today.", stored) == "Open a book before your phone today."
+
+
+def test_different_tone_misses(cache):
+    template = get_template("daily_system_initiation")
+    stored = variables("daily_system_initiation", "Run a marathon")
+    cache.store(*similarity_key(template.hash, stored), "Go.")
+
+    current = variables("daily_system_initiation", "Run a marathon", tone="Calm coach")
+    assert cache.lookup(*similarity_key(template.hash, current)) is None
+
+
+def test_other_template_misses(cache):
+    stored = variables("daily_system_initiation", "Run a marathon")
+    cache.store(*similarity_key(get_template("daily_system_initiation").hash, stored), "Go.")
+
+    other = get_template("daily_system_shutdown")
+    assert cache.lookup(*similarity_key(other.hash, variables("daily_system_shutdown", "Run a marathon"))) is None
+
+
+def test_generate_does_not_reuse_other_goal(monkeypatch, cache):
+    monkeypatch.setattr(ai_utils, "SIMILARITY_CACHE_ENABLED", True)
+    monkeypatch.setattr(ai_utils, "similarity_cache", cache)
+    template = get_template("daily_system_initiation")
+
+    first_vars = variables("daily_system_initiation", "Run a marathon")
+    first = ai_utils.generate_openai_message(template.render(first_vars), first_vars, template.hash, model_tier="small")
+    second_vars = variables("daily_system_initiation", "Learn Spanish")
+    second = ai_utils.generate_openai_message(template.render(second_vars), second_vars, template.hash, model_tier="small")
+
+    assert first != second
+    assert cache.stats["misses"] == 2
+
+
+def test_generate_skips_store_for_ambiguous_values(monkeypatch, cache):
+    monkeypatch.setattr(ai_utils, "SIMILARITY_CACHE_ENABLED", True)
+    monkeypatch.setattr(ai_utils, "similarity_cache", cache)
+    monkeypatch.setattr(ai_utils.router, "complete", lambda prompt, tier: ("You will read more today, and you will love it.", "fake"))
+    template = get_template("daily_system_initiation")
+
+    will_vars = variables("daily_system_initiation", "Read more", full_name="Will")
+    ai_utils.generate_openai_message(template.render(will_vars), will_vars, template.hash, model_tier="small")
+
+    assert cache.stats["stores_skipped"] == 1
+    assert not cache.entries